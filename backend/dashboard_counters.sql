@@ -0,0 +1,203 @@
+-- ============================================
+-- DASHBOARD COUNTERS (getDashboardUsers / getDashboardUsersByYear)
+-- ============================================
+-- Run after dashboard_stats_tables.sql: replaces its COUNT(*) functions with
+-- reads of counters kept up to date by triggers.
+
+-- Rows that currently exist, per metric and per month they were created in
+-- (UTC). A year is its 12 months and a total is every month of a metric, so
+-- dashboard reads touch a few hundred rows at most however big the tables get.
+CREATE TABLE IF NOT EXISTS dashboard_counters (
+    metric TEXT NOT NULL, -- 'users', 'vendors', 'restaurants', 'riders'
+    month DATE NOT NULL, -- first day of the month; rows without created_at count under 1970-01
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (metric, month)
+);
+
+CREATE OR REPLACE FUNCTION dashboard_month(created_at TIMESTAMP WITH TIME ZONE)
+RETURNS DATE AS $$
+    SELECT date_trunc('month', COALESCE(created_at, 'epoch') AT TIME ZONE 'UTC')::date;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Statement trigger: TG_ARGV[0] is an expression over a row of the table giving
+-- its metric, or NULL if the row is not counted. The rows a statement touched
+-- are read from its transition tables and applied as one delta per
+-- (metric, month), so a bulk import or COPY costs one counter update per month.
+CREATE OR REPLACE FUNCTION count_dashboard_rows()
+RETURNS trigger AS $$
+DECLARE
+    deltas TEXT;
+BEGIN
+    deltas := CASE TG_OP
+        WHEN 'INSERT' THEN format('SELECT %s AS metric, created_at, 1 AS delta FROM new_rows', TG_ARGV[0])
+        WHEN 'DELETE' THEN format('SELECT %s AS metric, created_at, -1 AS delta FROM old_rows', TG_ARGV[0])
+        ELSE format('SELECT %1$s AS metric, created_at, 1 AS delta FROM new_rows
+                     UNION ALL SELECT %1$s, created_at, -1 FROM old_rows', TG_ARGV[0])
+    END;
+    -- Sorted so concurrent statements lock counter rows in the same order
+    EXECUTE format($sql$
+        INSERT INTO dashboard_counters AS c (metric, month, count)
+        SELECT metric, dashboard_month(created_at), sum(delta)
+        FROM (%s) d
+        WHERE metric IS NOT NULL
+        GROUP BY 1, 2
+        HAVING sum(delta) <> 0
+        ORDER BY 1, 2
+        ON CONFLICT (metric, month) DO UPDATE SET count = c.count + EXCLUDED.count
+    $sql$, deltas);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- TRUNCATE has no transition tables: TG_ARGV lists the metrics to zero
+CREATE OR REPLACE FUNCTION reset_dashboard_counters()
+RETURNS trigger AS $$
+BEGIN
+    DELETE FROM dashboard_counters WHERE metric = ANY(TG_ARGV);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recount everything from the tables, e.g. after installing or to repair drift.
+-- Blocks writes to the counted tables while it runs.
+CREATE OR REPLACE FUNCTION rebuild_dashboard_counters()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE users, restaurants, riders_data IN SHARE MODE;
+    DELETE FROM dashboard_counters;
+    INSERT INTO dashboard_counters (metric, month, count)
+    SELECT metric, dashboard_month(created_at), COUNT(*)
+    FROM (
+        SELECT CASE user_type WHEN 'CUSTOMER' THEN 'users' WHEN 'VENDOR' THEN 'vendors' END AS metric, created_at
+        FROM users
+        UNION ALL
+        SELECT 'restaurants', created_at FROM restaurants
+        UNION ALL
+        SELECT 'riders', created_at FROM riders_data WHERE user_id IS NOT NULL
+    ) rows
+    WHERE metric IS NOT NULL
+    GROUP BY 1, 2;
+END;
+$$ LANGUAGE plpgsql;
+
+-- What each table counts as. Riders need a user, as in the riders view.
+DO $$
+DECLARE
+    spec RECORD;
+    op TEXT;
+BEGIN
+    FOR spec IN
+        SELECT * FROM (VALUES
+            ('users', $m$CASE user_type WHEN 'CUSTOMER' THEN 'users' WHEN 'VENDOR' THEN 'vendors' END$m$,
+             ARRAY['users', 'vendors']),
+            ('restaurants', $m$'restaurants'$m$, ARRAY['restaurants']),
+            ('riders_data', $m$CASE WHEN user_id IS NOT NULL THEN 'riders' END$m$, ARRAY['riders'])
+        ) AS s(tbl, metric, metrics)
+    LOOP
+        FOREACH op IN ARRAY ARRAY['insert', 'update', 'delete'] LOOP
+            EXECUTE format('DROP TRIGGER IF EXISTS dashboard_count_%s ON %I', op, spec.tbl);
+            EXECUTE format(
+                'CREATE TRIGGER dashboard_count_%s AFTER %s ON %I REFERENCING %s FOR EACH STATEMENT '
+                'EXECUTE FUNCTION count_dashboard_rows(%L)',
+                op, upper(op), spec.tbl,
+                CASE op WHEN 'insert' THEN 'NEW TABLE AS new_rows'
+                        WHEN 'delete' THEN 'OLD TABLE AS old_rows'
+                        ELSE 'OLD TABLE AS old_rows NEW TABLE AS new_rows' END,
+                spec.metric);
+        END LOOP;
+        EXECUTE format('DROP TRIGGER IF EXISTS dashboard_count_truncate ON %I', spec.tbl);
+        EXECUTE format(
+            'CREATE TRIGGER dashboard_count_truncate AFTER TRUNCATE ON %I FOR EACH STATEMENT '
+            'EXECUTE FUNCTION reset_dashboard_counters(%s)',
+            spec.tbl, (SELECT string_agg(quote_literal(m), ', ') FROM unnest(spec.metrics) m));
+    END LOOP;
+END;
+$$;
+
+-- Triggers are in place and the rebuild holds its lock until this migration commits
+SELECT rebuild_dashboard_counters();
+
+
+-- 1. getDashboardUsers: totals, same return type as before
+CREATE OR REPLACE FUNCTION get_dashboard_users()
+RETURNS SETOF dashboard_users_stats_table AS $$
+    SELECT
+        COALESCE(SUM(count) FILTER (WHERE metric = 'users'), 0)::INT,
+        COALESCE(SUM(count) FILTER (WHERE metric = 'vendors'), 0)::INT,
+        COALESCE(SUM(count) FILTER (WHERE metric = 'restaurants'), 0)::INT,
+        COALESCE(SUM(count) FILTER (WHERE metric = 'riders'), 0)::INT
+    FROM dashboard_counters;
+$$ LANGUAGE sql STABLE;
+
+
+-- 2. getDashboardUsersByYear: created in `year` (current year when NULL), and
+-- the change from the year before in percent. A metric with nothing the year
+-- before shows 100 if it has anything this year, 0 otherwise.
+CREATE OR REPLACE FUNCTION dashboard_percent_change(current_count BIGINT, previous_count BIGINT)
+RETURNS FLOAT AS $$
+    SELECT CASE
+        WHEN COALESCE(previous_count, 0) = 0 THEN CASE WHEN COALESCE(current_count, 0) > 0 THEN 100 ELSE 0 END
+        ELSE round((COALESCE(current_count, 0) - previous_count) * 100.0 / previous_count, 2)
+    END::FLOAT;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION get_dashboard_users_by_year(year int)
+RETURNS SETOF dashboard_users_year_stats_table AS $$
+    WITH bounds AS (
+        SELECT make_date(y, 1, 1) AS this_year, make_date(y - 1, 1, 1) AS last_year, make_date(y + 1, 1, 1) AS next_year
+        FROM (SELECT COALESCE(year, EXTRACT(YEAR FROM NOW() AT TIME ZONE 'UTC')::int) AS y) requested
+    ),
+    counts AS (
+        SELECT
+            metric,
+            SUM(count) FILTER (WHERE month >= b.this_year)::BIGINT AS current_count,
+            SUM(count) FILTER (WHERE month < b.this_year)::BIGINT AS previous_count
+        FROM dashboard_counters, bounds b
+        WHERE month >= b.last_year AND month < b.next_year
+        GROUP BY metric
+    )
+    SELECT
+        COALESCE(MAX(current_count) FILTER (WHERE metric = 'users'), 0)::INT,
+        COALESCE(MAX(current_count) FILTER (WHERE metric = 'vendors'), 0)::INT,
+        COALESCE(MAX(current_count) FILTER (WHERE metric = 'restaurants'), 0)::INT,
+        COALESCE(MAX(current_count) FILTER (WHERE metric = 'riders'), 0)::INT,
+        json_build_object(
+            'usersPercent', dashboard_percent_change(MAX(current_count) FILTER (WHERE metric = 'users'),
+                                                     MAX(previous_count) FILTER (WHERE metric = 'users')),
+            'vendorsPercent', dashboard_percent_change(MAX(current_count) FILTER (WHERE metric = 'vendors'),
+                                                       MAX(previous_count) FILTER (WHERE metric = 'vendors')),
+            'restaurantsPercent', dashboard_percent_change(MAX(current_count) FILTER (WHERE metric = 'restaurants'),
+                                                           MAX(previous_count) FILTER (WHERE metric = 'restaurants')),
+            'ridersPercent', dashboard_percent_change(MAX(current_count) FILTER (WHERE metric = 'riders'),
+                                                      MAX(previous_count) FILTER (WHERE metric = 'riders'))
+        )
+    FROM counts;
+$$ LANGUAGE sql STABLE;
+
+
+-- 3. getDashboardUsersByMonth: the 12 months of `year` for charts
+DROP FUNCTION IF EXISTS get_dashboard_users_by_month(int);
+DROP TABLE IF EXISTS dashboard_users_month_stats_table CASCADE;
+
+CREATE TABLE dashboard_users_month_stats_table (
+    "month" INT,
+    "usersCount" INT,
+    "vendorsCount" INT,
+    "restaurantsCount" INT,
+    "ridersCount" INT
+);
+
+CREATE OR REPLACE FUNCTION get_dashboard_users_by_month(year int)
+RETURNS SETOF dashboard_users_month_stats_table AS $$
+    SELECT
+        m::INT,
+        COALESCE(SUM(c.count) FILTER (WHERE c.metric = 'users'), 0)::INT,
+        COALESCE(SUM(c.count) FILTER (WHERE c.metric = 'vendors'), 0)::INT,
+        COALESCE(SUM(c.count) FILTER (WHERE c.metric = 'restaurants'), 0)::INT,
+        COALESCE(SUM(c.count) FILTER (WHERE c.metric = 'riders'), 0)::INT
+    FROM (SELECT COALESCE(year, EXTRACT(YEAR FROM NOW() AT TIME ZONE 'UTC')::int) AS y) requested
+    CROSS JOIN generate_series(1, 12) AS m
+    LEFT JOIN dashboard_counters c ON c.month = make_date(requested.y, m, 1)
+    GROUP BY m
+    ORDER BY m;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,26 @@
+-- ============================================
+-- DELIVERY BOUNDS
+-- ============================================
+
+-- Area a restaurant delivers to, set by updateDeliveryBoundsAndLocation:
+-- a circle around the restaurant (RADIUS), a drawn polygon (POLYGON) or its zone (ZONE)
+ALTER TABLE restaurants ADD COLUMN IF NOT EXISTS delivery_bounds GEOGRAPHY(POLYGON, 4326);
+ALTER TABLE restaurants ADD COLUMN IF NOT EXISTS delivery_bound_type TEXT;
+ALTER TABLE restaurants ADD COLUMN IF NOT EXISTS delivery_radius DOUBLE PRECISION; -- meters, RADIUS only
+
+-- Serves the "who delivers here" ST_Intersects lookup (restaurantsDeliveringTo)
+CREATE INDEX IF NOT EXISTS idx_restaurants_delivery_bounds ON restaurants USING GIST (delivery_bounds);
+
+-- Existing restaurants deliver to the zone they are assigned to and located in
+UPDATE restaurants r
+SET delivery_bounds = z.location,
+    delivery_bound_type = 'ZONE'
+FROM restaurant_zones rz
+JOIN zones z ON z.id = rz.zone_id
+WHERE rz.restaurant_id = r.id
+  AND r.delivery_bounds IS NULL
+  AND r.location IS NOT NULL
+  AND z.is_active
+  AND ST_Covers(z.location, r.location);
+
+ANALYZE restaurants;
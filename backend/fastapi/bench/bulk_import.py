@@ -0,0 +1,78 @@
+"""
+Onboarding N stores: repeated /createStore calls vs one /bulkCreateStores.
+
+Both paths go through the app in-process (FastAPI TestClient) against
+DATABASE_URL; every seeded store is removed afterwards.
+
+    cd backend/fastapi && python -m bench.bulk_import --stores 300
+"""
+import argparse
+import time
+import uuid
+
+from bench.common import connect, print_table
+
+DAYS = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY"]
+
+
+def make_stores(count, tag):
+    return [{
+        "name": f"Bench Franchise {i}",
+        "address": f"{i} Franchise Avenue",
+        "slug": f"{tag}-{i}",
+        "deliveryTime": 25,
+        "minimumOrder": 10,
+        "tax": 5,
+        "cuisines": ["Burgers", "Fries"],
+        "openingTimes": [{"day": d, "startTime": "09:00", "endTime": "22:00"} for d in DAYS],
+    } for i in range(count)]
+
+
+def cleanup(tag):
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM restaurants WHERE slug LIKE %s", (tag + "-%",))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def run(count):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    rows = []
+
+    tag = f"bench-single-{uuid.uuid4().hex[:8]}"
+    try:
+        start = time.perf_counter()
+        for store in make_stores(count, tag):
+            response = client.post("/createStore", json={"input": {"restaurant": store}})
+            response.raise_for_status()
+        single = time.perf_counter() - start
+    finally:
+        cleanup(tag)
+    rows.append(("createStore x N", count, f"{single * 1000:.0f}", f"{count / single:.0f}"))
+
+    tag = f"bench-bulk-{uuid.uuid4().hex[:8]}"
+    try:
+        start = time.perf_counter()
+        response = client.post("/bulkCreateStores", json={"input": {"restaurants": make_stores(count, tag)}})
+        response.raise_for_status()
+        bulk = time.perf_counter() - start
+        assert response.json()["inserted"] == count, response.json()["errors"][:3]
+    finally:
+        cleanup(tag)
+    rows.append(("bulkCreateStores", count, f"{bulk * 1000:.0f}", f"{count / bulk:.0f}"))
+
+    print_table("Store import", ["path", "stores", "total ms", "stores/s"], rows)
+    print(f"speedup: {single / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stores", type=int, default=300)
+    args = parser.parse_args()
+    run(args.stores)
@@ -0,0 +1,129 @@
+"""
+Dashboard user stats: COUNT(*) scans vs trigger-maintained counters.
+
+Seeds N users (customers, vendors and riders, created over the last three
+years) in DATABASE_URL, then times
+
+  scan       the four COUNT(*) queries the old get_dashboard_users ran
+  counters   get_dashboard_users(), get_dashboard_users_by_year() and
+             get_dashboard_users_by_month() from dashboard_counters.sql
+
+and the cost the triggers add to a one-row user insert (compared with the
+same insert with triggers off, if the role may do that). Checks that the
+counters, kept by the triggers alone, still equal the scans afterwards.
+Seeded users are removed.
+
+    cd backend/fastapi && python -m bench.dashboard_counters --users 200000
+"""
+import argparse
+import os
+import uuid
+
+os.environ.setdefault("DB_POOL_MIN", "0")
+
+from psycopg2 import errors
+
+from bench.common import connect, print_table, summarize, time_calls
+
+SCAN_SQL = """
+    SELECT (SELECT COUNT(*) FROM users WHERE user_type = 'CUSTOMER'),
+           (SELECT COUNT(*) FROM users WHERE user_type = 'VENDOR'),
+           (SELECT COUNT(*) FROM restaurants),
+           (SELECT COUNT(*) FROM riders)
+"""
+
+
+def seed(conn, tag, count):
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO users (email, password, name, user_type, created_at)
+            SELECT %s || '-' || g || '@bench.local', 'bench', 'Bench user ' || g,
+                   (ARRAY['CUSTOMER', 'CUSTOMER', 'VENDOR', 'RIDER'])[1 + g %% 4],
+                   NOW() - (g %% 1095) * INTERVAL '1 day'
+            FROM generate_series(1, %s) g
+        """, (tag, count))
+        cur.execute("""
+            INSERT INTO riders_data (user_id, created_at)
+            SELECT id, created_at FROM users WHERE email LIKE %s AND user_type = 'RIDER'
+        """, (tag + "-%",))
+        cur.execute("ANALYZE users")
+    conn.commit()
+
+
+def drop(conn, tag):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM riders_data WHERE user_id IN (SELECT id FROM users WHERE email LIKE %s)",
+                    (tag + "-%",))
+        cur.execute("DELETE FROM users WHERE email LIKE %s", (tag + "-%",))
+    conn.commit()
+
+
+def run(users, iterations):
+    tag = "bench-" + uuid.uuid4().hex[:8]
+    conn = connect()
+    rows = []
+
+    def timed(name, sql, args=()):
+        def call():
+            with conn.cursor() as cur:
+                cur.execute(sql, args)
+                cur.fetchall()
+            conn.commit()
+        stats = summarize(time_calls(call, iterations))
+        rows.append((name, f"{stats['p50']:.3f}", f"{stats['p95']:.3f}", f"{stats['p99']:.3f}"))
+
+    inserts = iter(range(10 ** 9))
+
+    def insert(triggers):
+        def call():
+            with conn.cursor() as cur:
+                if not triggers:
+                    cur.execute("SET LOCAL session_replication_role = replica")
+                cur.execute("""
+                    INSERT INTO users (email, password, name, user_type)
+                    VALUES (%s, 'bench', 'Bench signup', 'CUSTOMER')
+                """, (f"{tag}-{'signup' if triggers else 'uncounted'}-{next(inserts)}@bench.local",))
+            conn.commit()
+        return call
+
+    try:
+        seed(conn, tag, users)
+        timed("scan (4 x COUNT(*))", SCAN_SQL)
+        timed("get_dashboard_users", "SELECT * FROM get_dashboard_users()")
+        timed("get_dashboard_users_by_year", "SELECT * FROM get_dashboard_users_by_year(NULL)")
+        timed("get_dashboard_users_by_month", "SELECT * FROM get_dashboard_users_by_month(NULL)")
+
+        stats = summarize(time_calls(insert(True), iterations))
+        rows.append(("user insert, counters on", f"{stats['p50']:.3f}", f"{stats['p95']:.3f}", f"{stats['p99']:.3f}"))
+        try:
+            stats = summarize(time_calls(insert(False), iterations))
+            rows.append(("user insert, triggers off", f"{stats['p50']:.3f}", f"{stats['p95']:.3f}",
+                         f"{stats['p99']:.3f}"))
+            with conn.cursor() as cur:
+                # Remove the uncounted inserts the way they were made, so the counters stay exact
+                cur.execute("SET LOCAL session_replication_role = replica")
+                cur.execute("DELETE FROM users WHERE email LIKE %s", (tag + "-uncounted-%",))
+            conn.commit()
+        except errors.InsufficientPrivilege:
+            conn.rollback()
+
+        with conn.cursor() as cur:
+            cur.execute(SCAN_SQL)
+            scanned = cur.fetchone()
+            cur.execute("SELECT * FROM get_dashboard_users()")
+            counted = cur.fetchone()
+        conn.commit()
+    finally:
+        drop(conn, tag)
+        conn.close()
+    print_table(f"Dashboard user stats in ms ({users} seeded users)", ["query", "p50", "p95", "p99"], rows)
+    print(f"\nscan {tuple(scanned)} vs counters {tuple(counted)}: "
+          f"{'match' if tuple(scanned) == tuple(counted) else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=200000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    run(args.users, args.iterations)
@@ -0,0 +1,75 @@
+"""
+Per-row cost of turning restaurantsPaginated rows into a JSON response body.
+
+No database needed: synthetic rows with the query's column types are
+built into the handler's response and serialized two ways:
+
+  default   jsonable_encoder + json.dumps (FastAPI's default, FAST_JSON=0)
+  fast      FastJSONResponse (FAST_JSON=1, orjson)
+
+    cd backend/fastapi && python -m bench.json_encoding --rows 10 100 500
+"""
+import argparse
+import datetime
+import json
+import os
+import uuid
+from decimal import Decimal
+
+os.environ.setdefault("DB_POOL_MIN", "0")
+
+from fastapi.encoders import jsonable_encoder
+
+from bench.common import print_table, summarize, time_calls
+
+
+def make_rows(count):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return [(
+        str(uuid.uuid4()), f"{n:024x}", f"Store {n}", f"http://localhost:8000/static/{n}.jpg", f"store-{n}",
+        f"{n} Main Street", 30, Decimal("12.50"), True, Decimal("15.00"), Decimal("5.00") if n % 3 else None,
+        f"{n:024x}", f"owner{n}@example.com", True, now,
+    ) for n in range(count)]
+
+
+def default_render(content):
+    # What FastAPI does with a plain dict return value
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode()
+
+
+def run(sizes, iterations):
+    from fastjson import HAS_ORJSON, FastJSONResponse
+    from main import _paginated_restaurant
+
+    rows = []
+    for count in sizes:
+        data = make_rows(count)
+
+        def page():
+            return {"data": [_paginated_restaurant(row) for row in data],
+                    "totalCount": count, "currentPage": 1, "totalPages": 1}
+        assert json.loads(FastJSONResponse(page()).body) == json.loads(default_render(page()))
+
+        timings = {
+            "default": summarize(time_calls(lambda: default_render(page()), iterations)),
+            "fast": summarize(time_calls(lambda: FastJSONResponse(page()).body, iterations)),
+        }
+        base = timings["default"]["p50"]
+        for name, stats in timings.items():
+            rows.append((
+                count, name,
+                f"{stats['p50']:.3f}",
+                f"{stats['p50'] / count * 1000:.2f}",
+                f"{base / stats['p50']:.1f}x",
+            ))
+    print_table(f"Response serialization (orjson: {'yes' if HAS_ORJSON else 'no'})",
+                ["rows", "path", "p50 ms", "us/row", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    run(args.rows, args.iterations)
@@ -0,0 +1,195 @@
+"""
+Load test: replay Hasura action payloads against every FastAPI handler.
+
+Seeds a tagged dataset in DATABASE_URL, then sends each scenario's
+{"action", "input", "session_variables"} bodies at each concurrency level
+and reports throughput, error counts and p50/p95/p99 latency. The app runs
+in-process by default; --url targets a running server instead. Seeded and
+created rows (and uploaded files, in-process) are removed afterwards.
+
+Results are written as JSON (stdout, or --output). --compare checks them
+against an earlier result file and exits non-zero on a regression.
+
+    cd backend/fastapi && python -m bench.load --concurrency 1 8 32 --output after.json
+    cd backend/fastapi && python -m bench.load --only restaurantsPaginated fetchCuisines --compare before.json
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import httpx
+
+from bench.common import print_table, summarize
+from bench.scenarios import SCENARIOS, cleanup, seed, static_files
+
+UPLOAD_DIR = "static"
+
+
+async def run_scenario(client, scenario, data, counter, requests, concurrency, warmup):
+    for _ in range(warmup):
+        await client.post(scenario.path, **scenario.build(data, next(counter)))
+
+    latencies = []
+    statuses = {}
+    pending = iter(range(requests))
+
+    async def worker():
+        for _ in pending:
+            kwargs = scenario.build(data, next(counter))
+            start = time.perf_counter()
+            try:
+                response = await client.post(scenario.path, **kwargs)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0  # connection error / timeout
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    stats = summarize(latencies)
+    return {
+        "scenario": scenario.name,
+        "path": scenario.path,
+        "kind": scenario.kind,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": sum(n for status, n in statuses.items() if status == 0 or status >= 400),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "seconds": round(elapsed, 4),
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latencyMs": {
+            "mean": round(stats["mean"], 3),
+            "p50": round(stats["p50"], 3),
+            "p95": round(stats["p95"], 3),
+            "p99": round(stats["p99"], 3),
+            "max": round(max(latencies), 3) if latencies else 0.0,
+        },
+    }
+
+
+def make_client(url, timeout):
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=timeout)
+    from main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=timeout)
+
+
+async def run(args, scenarios):
+    data = seed(stores=args.stores)
+    files_before = static_files(UPLOAD_DIR) if not args.url else None
+    results = []
+    try:
+        async with make_client(args.url, args.timeout) as client:
+            for scenario in scenarios:
+                counter = itertools.count()
+                for concurrency in args.concurrency:
+                    result = await run_scenario(
+                        client, scenario, data, counter, args.requests, concurrency, args.warmup)
+                    results.append(result)
+                    print(f"  {scenario.name:32} c={concurrency:<4} {result['throughput']:>9.1f} req/s  "
+                          f"p95 {result['latencyMs']['p95']:.1f} ms  errors {result['errors']}", file=sys.stderr)
+    finally:
+        cleanup(data)
+        if files_before is not None:
+            for name in static_files(UPLOAD_DIR) - files_before:
+                os.remove(os.path.join(UPLOAD_DIR, name))
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, results, threshold):
+    """Print p95/throughput changes against `baseline` to stderr; return the regressed rows."""
+    before = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    rows = []
+    regressions = []
+    for r in results:
+        old = before.get((r["scenario"], r["concurrency"]))
+        if old is None:
+            continue
+        p95_change = _change(old["latencyMs"]["p95"], r["latencyMs"]["p95"])
+        tput_change = _change(old["throughput"], r["throughput"])
+        regressed = p95_change > threshold or tput_change < -threshold
+        if regressed:
+            regressions.append(r)
+        rows.append((
+            r["scenario"], r["concurrency"],
+            f"{old['latencyMs']['p95']:.1f}", f"{r['latencyMs']['p95']:.1f}", f"{p95_change:+.1f}%",
+            f"{old['throughput']:.1f}", f"{r['throughput']:.1f}", f"{tput_change:+.1f}%",
+            "REGRESSED" if regressed else "",
+        ))
+    print_table(f"Against {baseline['meta'].get('revision') or 'baseline'} (threshold {threshold}%)",
+                ["scenario", "c", "p95 before", "p95 after", "change", "req/s before", "req/s after", "change", ""],
+                rows, file=sys.stderr)
+    return regressions
+
+
+def _change(old, new):
+    return (new - old) / old * 100 if old else 0.0
+
+
+def main():
+    names = [s.name for s in SCENARIOS]
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="base URL of a running service (default: in-process app)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and concurrency level")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--stores", type=int, default=50, help="seeded restaurants")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--only", nargs="+", choices=names, metavar="SCENARIO", help="scenarios to run")
+    parser.add_argument("--reads-only", action="store_true", help="skip scenarios that write")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="percent change in p95 or throughput counted as a regression")
+    args = parser.parse_args()
+
+    scenarios = [s for s in SCENARIOS
+                 if (not args.only or s.name in args.only) and (not args.reads_only or s.kind == "read")]
+    results = asyncio.run(run(args, scenarios))
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "target": args.url or "in-process",
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "stores": args.stores,
+        },
+        "results": results,
+    }
+    body = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(body + "\n")
+    else:
+        print(body)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(baseline, results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Rider location ingestion at a fixed ping rate on one worker.
+
+Seeds N available riders in DATABASE_URL, then sends updateRiderLocations
+requests straight to the app's ASGI callable (no HTTP client sharing the
+CPU) on a schedule of --rate pings per second (--batch pings per request)
+for --seconds. Reports the rate achieved,
+request latency and how many database writes the pings turned into. After
+the last flush it checks that every rider's stored position is the newest
+one sent. Seeded riders are removed afterwards.
+
+    cd backend/fastapi && python -m bench.location_ingest --riders 2000 --rate 5000 --seconds 10
+    cd backend/fastapi && python -m bench.location_ingest --rate 5000 --batch 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+os.environ.setdefault("DB_POOL_MIN", "0")
+
+from bench.common import connect, print_table, summarize
+
+
+def seed_riders(conn, tag, count):
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO users (email, password, name, user_type)
+            SELECT %s || '-rider-' || g || '@bench.local', 'bench', 'Bench rider ' || g, 'RIDER'
+            FROM generate_series(1, %s) g
+            RETURNING id::text
+        """, (tag, count))
+        rider_ids = [r[0] for r in cur.fetchall()]
+        cur.execute("INSERT INTO riders_data (user_id, is_available) SELECT unnest(%s::uuid[]), true", (rider_ids,))
+    conn.commit()
+    return rider_ids
+
+
+def drop_riders(conn, tag):
+    with conn.cursor() as cur:
+        cur.execute("""
+            DELETE FROM riders_data WHERE user_id IN (SELECT id FROM users WHERE email LIKE %s)
+        """, (tag + "-%",))
+        cur.execute("DELETE FROM users WHERE email LIKE %s", (tag + "-%",))
+    conn.commit()
+
+
+async def post(app, path, body):
+    """One POST through the ASGI app, as the server would run it; returns the status code."""
+    messages = [{"type": "http.request", "body": json.dumps(body).encode(), "more_body": False}]
+    status = []
+
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    return status[0]
+
+
+async def send(app, rider_ids, rate, seconds, batch, concurrency, rng):
+    total_requests = int(rate * seconds / batch)
+    interval = batch / rate
+    sent = {}
+    latencies = []
+    statuses = {}
+    lag = [0.0]
+    pending = iter(range(total_requests))
+    start = time.perf_counter()
+
+    async def worker():
+        for n in pending:
+            due = start + n * interval
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                lag[0] = max(lag[0], -delay)
+            pings = []
+            for _ in range(batch):
+                rider_id = rng.choice(rider_ids)
+                lat, lng = 40.7 + rng.random() / 10, -74 + rng.random() / 10
+                pings.append({"riderId": rider_id, "latitude": lat, "longitude": lng,
+                              "recordedAt": int(time.time() * 1000)})
+                sent[rider_id] = (lat, lng)
+            body = {"action": {"name": "updateRiderLocations"}, "input": {"pings": pings},
+                    "session_variables": {"x-hasura-role": "rider"}}
+            begin = time.perf_counter()
+            status = await post(app, "/updateRiderLocations", body)
+            latencies.append((time.perf_counter() - begin) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return sent, latencies, statuses, time.perf_counter() - start, lag[0]
+
+
+def run(riders, rate, seconds, batch, concurrency):
+    import main
+
+    tag = "bench-" + uuid.uuid4().hex[:8]
+    rng = random.Random(1)
+    conn = connect()
+    try:
+        rider_ids = seed_riders(conn, tag, riders)
+        before = main.location_buffer.stats()
+        sent, latencies, statuses, elapsed, lag = asyncio.run(
+            send(main.app, rider_ids, rate, seconds, batch, concurrency, rng))
+        main.location_buffer.flush()
+        after = main.location_buffer.stats()
+
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT user_id::text, ST_Y(current_location::geometry), ST_X(current_location::geometry)
+                FROM riders_data WHERE user_id = ANY(%s::uuid[])
+            """, (rider_ids,))
+            stored = {r[0]: (r[1], r[2]) for r in cur.fetchall()}
+        conn.commit()
+        mismatched = sum(1 for r, (lat, lng) in sent.items()
+                         if stored.get(r) is None or abs(stored[r][0] - lat) > 1e-9 or abs(stored[r][1] - lng) > 1e-9)
+    finally:
+        drop_riders(conn, tag)
+        conn.close()
+        main.location_buffer.close()
+
+    pings = sum(statuses.values()) * batch
+    stats = summarize(latencies)
+    flushes = after["flushes"] - before["flushes"]
+    written = after["flushed"] - before["flushed"]
+    print_table(
+        f"updateRiderLocations: {riders} riders, target {rate} pings/s, {batch} per request, "
+        f"flush every {main.location_buffer.interval}s",
+        ["pings", "pings/s", "p50 ms", "p99 ms", "max lag ms", "statuses", "flushes", "rows written",
+         "pings/row", "stale rows"],
+        [(pings, f"{pings / elapsed:.0f}", f"{stats['p50']:.2f}", f"{stats['p99']:.2f}", f"{lag * 1000:.0f}",
+          ",".join(f"{k}:{v}" for k, v in sorted(statuses.items())), flushes, written,
+          f"{pings / max(written, 1):.1f}", mismatched)])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--riders", type=int, default=2000)
+    parser.add_argument("--rate", type=int, default=5000, help="pings per second")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--batch", type=int, default=1, help="pings per request")
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    run(args.riders, args.rate, args.seconds, args.batch, args.concurrency)
@@ -0,0 +1,108 @@
+"""
+nearbyRestaurants latency with N restaurants spread over a metro area.
+
+Seeds N active restaurants in DATABASE_URL (about 40 x 40 km), then times:
+
+  database  the KNN / ST_DWithin query alone for random points (no cache)
+  cold      the handler with the cell cache emptied before every call
+  warm      the handler for customers clustered in a few neighborhoods,
+            as on a busy evening (mostly cache hits)
+
+for page 1 and page 3. Seeded restaurants are removed afterwards.
+
+    cd backend/fastapi && python -m bench.nearby_restaurants --restaurants 100000
+"""
+import argparse
+import os
+import random
+import uuid
+
+os.environ.setdefault("DB_POOL_MIN", "0")
+
+from bench.common import connect, print_table, summarize, time_calls
+
+CENTER = (40.73, -73.99)
+SPAN = 0.36
+
+
+def seed(conn, tag, count):
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO restaurants (name, slug, address, location, delivery_time, minimum_order)
+            SELECT 'Nearby Store ' || g, %s || '-' || g, g || ' Nearby Street',
+                   ST_SetSRID(ST_MakePoint(%s + (random() - 0.5) * %s, %s + (random() - 0.5) * %s), 4326),
+                   20 + g %% 30, 10
+            FROM generate_series(1, %s) g
+        """, (tag, CENTER[1], SPAN, CENTER[0], SPAN, count))
+        cur.execute("ANALYZE restaurants")
+    conn.commit()
+
+
+def drop(conn, tag):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM restaurants WHERE slug LIKE %s", (tag + "-%",))
+    conn.commit()
+
+
+def run(count, radius, iterations, neighborhoods):
+    import main
+    from delivery_areas import nearby_cache
+
+    rng = random.Random(1)
+
+    def random_point():
+        return CENTER[0] + (rng.random() - 0.5) * SPAN, CENTER[1] + (rng.random() - 0.5) * SPAN
+
+    hotspots = [random_point() for _ in range(neighborhoods)]
+
+    def clustered_point():
+        lat, lng = rng.choice(hotspots)
+        return lat + rng.gauss(0, 0.003), lng + rng.gauss(0, 0.003)
+
+    def call(point, page):
+        lat, lng = point
+        return main.nearby_restaurants({"input": {
+            "location": {"latitude": lat, "longitude": lng}, "radius": radius, "page": page, "limit": 20}})
+
+    def cold(page):
+        nearby_cache.invalidate()
+        return call(random_point(), page)
+
+    tag = "nearby-" + uuid.uuid4().hex[:8]
+    conn = connect()
+    rows = []
+    try:
+        seed(conn, tag, count)
+        for page in (1, 3):
+            db = summarize(time_calls(
+                lambda: main._nearby_restaurant_rows(*random_point(), radius, 21, (page - 1) * 20), iterations))
+            cold_stats = summarize(time_calls(lambda: cold(page), iterations))
+            nearby_cache.invalidate()
+            sources = {}
+
+            def warm():
+                source = call(clustered_point(), page)["source"]
+                sources[source] = sources.get(source, 0) + 1
+
+            warm_stats = summarize(time_calls(warm, iterations * 10, warmup=0))
+            for name, stats in (("database", db), ("cold", cold_stats), ("warm", warm_stats)):
+                rows.append((
+                    page, name, f"{stats['p50']:.3f}", f"{stats['p95']:.3f}", f"{stats['p99']:.3f}",
+                    ",".join(f"{k}:{v}" for k, v in sorted(sources.items())) if name == "warm" else "",
+                ))
+    finally:
+        drop(conn, tag)
+        conn.close()
+    print_table(f"nearbyRestaurants latency in ms ({count} restaurants, radius {radius:g} m, "
+                f"{neighborhoods} neighborhoods)",
+                ["page", "path", "p50", "p95", "p99", "warm sources"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--restaurants", type=int, default=100000)
+    parser.add_argument("--radius", type=float, default=3000)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--neighborhoods", type=int, default=20)
+    args = parser.parse_args()
+    run(args.restaurants, args.radius, args.iterations, args.neighborhoods)
@@ -0,0 +1,259 @@
+"""
+orderEvents fan-out: --subscribers concurrent streams on one worker.
+
+Opens the streams through the app's ASGI callable (half following a
+restaurant, half a customer; --ws of them over the WebSocket route, the
+rest Server-Sent Events), then commits --waves waves of --batch order status
+changes and measures, from each commit, how long the matching streams take
+to receive their events. Reports memory per stream and checks every
+expected event arrived exactly once. For comparison, times the per-client
+query that polling through Hasura runs instead.
+
+Orders go to seeded restaurants and customers that are removed afterwards.
+
+    cd backend/fastapi && python -m bench.order_events --subscribers 10000
+"""
+import argparse
+import asyncio
+import os
+import resource
+import time
+import uuid
+from collections import Counter
+
+os.environ.setdefault("DB_POOL_MIN", "0")
+
+from bench.common import connect, print_table, summarize, time_calls
+from order_events import sign_subscription
+
+STATUSES = ["ACCEPTED", "PREPARING", "READY", "PICKED", "ON_THE_WAY", "DELIVERED"]
+
+POLL_SQL = """
+    SELECT id, order_id, status, rider_id, updated_at FROM orders
+    WHERE restaurant_id = %s AND updated_at > NOW() - INTERVAL '5 seconds'
+"""
+
+
+def seed(conn, tag, restaurants, customers, orders):
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO restaurants (name, slug, address)
+            SELECT 'Bench Events ' || g, %s || '-' || g, '1 Bench Street' FROM generate_series(1, %s) g
+            RETURNING id::text
+        """, (tag, restaurants))
+        restaurant_ids = [r[0] for r in cur.fetchall()]
+        cur.execute("""
+            INSERT INTO users (email, password, name, user_type)
+            SELECT %s || '-' || g || '@bench.local', 'bench', 'Bench customer ' || g, 'CUSTOMER'
+            FROM generate_series(1, %s) g
+            RETURNING id::text
+        """, (tag, customers))
+        customer_ids = [r[0] for r in cur.fetchall()]
+        cur.execute("""
+            INSERT INTO orders (order_id, restaurant_id, user_id, status, delivery_address, order_amount, total_amount)
+            SELECT %s || '-' || g, (%s::uuid[])[1 + g %% %s], (%s::uuid[])[1 + g %% %s], 'PENDING', '{}', 10, 13
+            FROM generate_series(1, %s) g
+            RETURNING id::text, restaurant_id::text, user_id::text
+        """, (tag, restaurant_ids, restaurants, customer_ids, customers, orders))
+        seeded = cur.fetchall()
+    conn.commit()
+    return restaurant_ids, customer_ids, seeded
+
+
+def drop(conn, tag):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM orders WHERE order_id LIKE %s", (tag + "-%",))
+        cur.execute("DELETE FROM restaurants WHERE slug LIKE %s", (tag + "-%",))
+        cur.execute("DELETE FROM users WHERE email LIKE %s", (tag + "-%",))
+    conn.commit()
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+
+
+class Streams:
+    """Subscribers driven through the ASGI app; counts "order" events per (stream, order)."""
+
+    def __init__(self, app):
+        self.app = app
+        self.closing = asyncio.Event()
+        self.opened = 0
+        self.statuses = Counter()
+        self.arrivals = []
+        self.received = Counter()
+        self.tasks = []
+
+    def _arrived(self, stream, data):
+        if data.startswith(b"event: order") or data.startswith(b'{"event": "order"'):
+            self.arrivals.append(time.perf_counter())
+            self.received[stream] += 1
+
+    async def _sse(self, stream, query):
+        sent = []
+
+        async def receive():
+            if not sent:
+                sent.append(True)
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await self.closing.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                self.statuses[message["status"]] += 1
+                self.opened += 1
+            elif message.get("body"):
+                self._arrived(stream, message["body"])
+
+        await self.app(self._scope("http", query), receive, send)
+
+    async def _ws(self, stream, query):
+        sent = []
+
+        async def receive():
+            if not sent:
+                sent.append(True)
+                return {"type": "websocket.connect"}
+            await self.closing.wait()
+            return {"type": "websocket.disconnect", "code": 1000}
+
+        async def send(message):
+            if message["type"] == "websocket.accept":
+                self.statuses["ws"] += 1
+                self.opened += 1
+            elif message["type"] == "websocket.close":
+                self.statuses[f"ws close {message.get('code')}"] += 1
+            elif message["type"] == "websocket.send":
+                self._arrived(stream, message["text"].encode())
+
+        await self.app(self._scope("websocket", query), receive, send)
+
+    @staticmethod
+    def _scope(kind, query):
+        path = "/orderEvents" if kind == "http" else "/orderEvents/ws"
+        scope = {
+            "type": kind, "asgi": {"version": "3.0"}, "http_version": "1.1", "scheme": "http" if kind == "http" else "ws",
+            "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+            "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("bench", 80),
+        }
+        if kind == "http":
+            scope["method"] = "GET"
+        else:
+            scope["subprotocols"] = []
+        return scope
+
+    def open(self, stream, query, websocket):
+        self.tasks.append(asyncio.ensure_future((self._ws if websocket else self._sse)(stream, query)))
+
+    async def close(self):
+        self.closing.set()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+async def load(app, hub, restaurant_ids, customer_ids, seeded, subscribers, ws_share, waves, batch):
+    streams = Streams(app)
+    # Which streams follow what: restaurants and customers round robin, half each
+    follows = {}
+    rss_before = rss_mb()
+    began = time.perf_counter()
+    for n in range(subscribers):
+        if n % 2:
+            key = ("customer", customer_ids[n // 2 % len(customer_ids)])
+        else:
+            key = ("restaurant", restaurant_ids[n // 2 % len(restaurant_ids)])
+        follows[n] = key
+        streams.open(n, "token=" + sign_subscription(*key), n % 100 < ws_share * 100)
+        if n % 500 == 499:
+            await asyncio.sleep(0)
+    while streams.opened < subscribers and time.perf_counter() - began < 60:
+        await asyncio.sleep(0.05)
+    while not hub.stats()["listening"] and time.perf_counter() - began < 60:
+        await asyncio.sleep(0.05)
+    connect_seconds = time.perf_counter() - began
+    rss_after = rss_mb()
+
+    per_key = Counter(follows.values())
+    conn = connect()
+    loop = asyncio.get_running_loop()
+    rows = []
+    expected = Counter()
+    try:
+        for wave in range(waves):
+            chosen = [seeded[(wave * batch + i) % len(seeded)] for i in range(batch)]
+            changed = Counter(("restaurant", r) for _, r, _ in chosen) + Counter(("customer", u) for _, _, u in chosen)
+            wanted = sum(per_key[key] * count for key, count in changed.items())
+            for n, key in follows.items():
+                expected[n] += changed[key]
+            streams.arrivals.clear()
+
+            def commit():
+                with conn.cursor() as cur:
+                    cur.execute("UPDATE orders SET status = %s WHERE id = ANY(%s::uuid[])",
+                                (STATUSES[wave % len(STATUSES)], [o for o, _, _ in chosen]))
+                # Events can arrive before this thread resumes, so time from the COMMIT itself
+                committing = time.perf_counter()
+                conn.commit()
+                return committing
+
+            committed = await loop.run_in_executor(None, commit)
+            deadline = time.perf_counter() + 30
+            while len(streams.arrivals) < wanted and time.perf_counter() < deadline:
+                await asyncio.sleep(0.01)
+            latencies = [(t - committed) * 1000 for t in streams.arrivals]
+            stats = summarize(latencies) if latencies else {"p50": 0, "p99": 0}
+            rows.append((wave + 1, batch, wanted, len(latencies), f"{stats['p50']:.1f}", f"{stats['p99']:.1f}",
+                         f"{max(latencies):.1f}" if latencies else ""))
+    finally:
+        conn.close()
+        hub_stats = hub.stats()
+        await streams.close()
+    exact = all(streams.received[n] == expected[n] for n in follows)
+    return rows, streams.statuses, connect_seconds, rss_before, rss_after, hub_stats, exact
+
+
+def run(subscribers, restaurants, customers, ws_share, waves, batch, iterations):
+    import main
+
+    tag = "bench-" + uuid.uuid4().hex[:8]
+    conn = connect()
+    restaurant_ids, customer_ids, seeded = seed(conn, tag, restaurants, customers, max(batch * waves, 1000))
+    main.order_events.max_subscribers = max(main.order_events.max_subscribers, subscribers)
+    try:
+        rows, statuses, connect_seconds, rss_before, rss_after, hub_stats, exact = asyncio.run(load(
+            main.app, main.order_events, restaurant_ids, customer_ids, seeded, subscribers, ws_share, waves, batch))
+
+        def poll():
+            with conn.cursor() as cur:
+                cur.execute(POLL_SQL, (restaurant_ids[0],))
+                cur.fetchall()
+            conn.commit()
+        poll_ms = summarize(time_calls(poll, iterations))["p50"]
+    finally:
+        drop(conn, tag)
+        conn.close()
+
+    print(f"{subscribers} streams ({ws_share:.0%} WebSocket) over {restaurants} restaurants and {customers} customers "
+          f"opened in {connect_seconds:.1f}s; statuses {dict(statuses)}")
+    print(f"worker memory {rss_before:.0f} MB -> {rss_after:.0f} MB "
+          f"({(rss_after - rss_before) * 1024 / subscribers:.1f} KB per stream); 1 LISTEN connection; "
+          f"hub: {hub_stats['received']} notifications, {hub_stats['delivered']} deliveries, "
+          f"{hub_stats['dropped']} dropped")
+    print_table("Commit to delivery (ms)", ["wave", "orders", "expected", "delivered", "p50", "p99", "last"], rows)
+    print(f"\nevery stream got exactly its events: {'yes' if exact else 'NO'}")
+    print(f"polling instead: {subscribers} clients every 5s = {subscribers / 5:.0f} queries/s at {poll_ms:.2f} ms "
+          f"each = {subscribers / 5 * poll_ms / 1000:.2f} DB seconds per second")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--restaurants", type=int, default=100)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--ws", type=float, default=0.1, help="share of streams over the WebSocket route")
+    parser.add_argument("--waves", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=200, help="orders changing status per wave")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    run(args.subscribers, args.restaurants, args.customers, args.ws, args.waves, args.batch, args.iterations)
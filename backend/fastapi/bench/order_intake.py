@@ -0,0 +1,119 @@
+"""
+placeOrder throughput at peak: one transaction per order vs the group-commit queue.
+
+Runs --clients concurrent customers, each placing orders back to back
+through the app's ASGI callable for --seconds, first with every order in
+its own transaction and then with ORDER_QUEUE_ENABLED behavior (orders
+committed in batches by the queue's writer). Reports orders per second,
+latency, statuses, the transactions committed in the database and the batch
+sizes, and checks that every acknowledged order is stored exactly once.
+Orders go to a seeded restaurant that is removed afterwards.
+
+    cd backend/fastapi && python -m bench.order_intake --clients 200 --seconds 10
+    cd backend/fastapi && python -m bench.order_intake --clients 400 --max-pending 100
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+os.environ.setdefault("DB_POOL_MIN", "0")
+
+from bench.common import connect, print_table, summarize
+from bench.location_ingest import post
+from bench.place_order import drop, items, seed
+
+
+def commits(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_stat_clear_snapshot()")
+        cur.execute("SELECT xact_commit FROM pg_stat_database WHERE datname = current_database()")
+        value = cur.fetchone()[0]
+    conn.commit()
+    return value
+
+
+async def load(app, user_id, restaurant_id, tag, clients, seconds, size):
+    latencies = []
+    statuses = {}
+    sequence = iter(range(10 ** 9))
+    deadline = time.perf_counter() + seconds
+
+    async def customer():
+        while time.perf_counter() < deadline:
+            body = {"action": {"name": "placeOrder"}, "session_variables": {"x-hasura-user-id": user_id}, "input": {
+                "idempotencyKey": f"{tag}-{next(sequence)}",
+                "order": {
+                    "restaurantId": restaurant_id, "items": items(size), "paymentMethod": "CASH",
+                    "deliveryAddress": {"street": "1 Bench Street", "city": "New York"},
+                    "orderAmount": "100.00", "deliveryCharges": "3.00", "taxAmount": "5.00", "totalAmount": "108.00",
+                },
+            }}
+            begin = time.perf_counter()
+            status = await post(app, "/placeOrder", body)
+            latencies.append((time.perf_counter() - begin) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 503:
+                await asyncio.sleep(0.05)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(customer() for _ in range(clients)))
+    return latencies, statuses, time.perf_counter() - start
+
+
+def run(clients, seconds, size, max_pending):
+    import main
+
+    tag = "bench-" + uuid.uuid4().hex[:8]
+    conn = connect()
+    user_id, restaurant_id = seed(conn, tag)
+    if max_pending:
+        main.order_queue.max_pending = max_pending
+    rows = []
+    try:
+        for queued in (False, True):
+            main.ORDER_QUEUE_ENABLED = queued
+            mode_tag = f"{tag}-{'queued' if queued else 'direct'}"
+            before_commits = commits(conn)
+            before = main.order_queue.stats()
+            latencies, statuses, elapsed = asyncio.run(
+                load(main.app, user_id, restaurant_id, mode_tag, clients, seconds, size))
+            after = main.order_queue.stats()
+            transactions = commits(conn) - before_commits
+
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT count(*), count(DISTINCT r.order_id)
+                    FROM order_requests r JOIN orders o ON o.id = r.order_id
+                    WHERE r.idempotency_key LIKE %s
+                """, (mode_tag + "-%",))
+                stored, distinct = cur.fetchone()
+            conn.commit()
+            placed = statuses.get(200, 0)
+            stats = summarize(latencies)
+            batches = after["batches"] - before["batches"]
+            rows.append((
+                "queued" if queued else "direct", placed, f"{placed / elapsed:.0f}", f"{stats['p50']:.1f}",
+                f"{stats['p99']:.1f}", ",".join(f"{k}:{v}" for k, v in sorted(statuses.items())), transactions,
+                f"{(after['placed'] - before['placed']) / batches:.1f}" if batches else "",
+                after["largestBatch"] if queued else "", "yes" if stored == distinct == placed else "NO",
+            ))
+    finally:
+        main.order_queue.close()
+        drop(conn, tag, restaurant_id)
+        conn.close()
+    print_table(f"placeOrder: {clients} clients, {size} items per order, {seconds:g}s per mode "
+                f"(queue: batches of up to {main.order_queue.max_batch}, {main.order_queue.max_pending} pending)",
+                ["mode", "orders", "orders/s", "p50 ms", "p99 ms", "statuses", "db commits", "avg batch",
+                 "max batch", "stored once"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--items", type=int, default=3, help="items per order")
+    parser.add_argument("--max-pending", type=int, default=0, help="override ORDER_QUEUE_MAX_PENDING")
+    args = parser.parse_args()
+    run(args.clients, args.seconds, args.items, args.max_pending)
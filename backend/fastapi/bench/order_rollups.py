@@ -0,0 +1,166 @@
+"""
+Dashboard order/sales stats: GROUP BY over orders vs the order rollups.
+
+Seeds N orders (spread over the last year, 20 restaurants, every status and
+payment method) in DATABASE_URL, rebuilds the rollups with the backfill
+command's code path and reports its rate and the client's peak memory, then
+times
+
+  scan      the GROUP BY over orders the dashboard functions would need
+  rollups   get_dashboard_orders_by_type(), get_dashboard_sales_by_type()
+            and orderStats for 30 days by day / 7 days by hour
+
+and a refresh after --changes orders change status. Checks that the rollups
+equal the scans afterwards. Seeded orders are removed and the removal is
+applied to the rollups.
+
+    cd backend/fastapi && python -m bench.order_rollups --orders 1000000
+"""
+import argparse
+import os
+import resource
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("DB_POOL_MIN", "0")
+
+from bench.common import connect, print_table, summarize, time_calls
+
+STATUSES = ["PENDING", "ACCEPTED", "PREPARING", "DELIVERED", "COMPLETED", "COMPLETED", "DELIVERED", "CANCELLED"]
+
+SCAN_SQL = {
+    "orders by status": "SELECT status, COUNT(*) FROM orders GROUP BY status",
+    "sales by payment method": """
+        SELECT payment_method, SUM(total_amount) FROM orders
+        WHERE status NOT IN ('CANCELLED', 'REJECTED') GROUP BY payment_method
+    """,
+    "30 days by day": """
+        SELECT (order_date AT TIME ZONE 'UTC')::date, status, COUNT(*), SUM(total_amount) FROM orders
+        WHERE order_date >= %(start)s AND order_date < %(end)s GROUP BY 1, 2
+    """,
+}
+
+
+def seed(conn, tag, count):
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO restaurants (name, slug, address)
+            SELECT 'Bench Rollups ' || g, %s || '-' || g, '1 Bench Street' FROM generate_series(1, 20) g
+            RETURNING id::text
+        """, (tag,))
+        restaurant_ids = [r[0] for r in cur.fetchall()]
+        cur.execute("""
+            INSERT INTO orders (order_id, restaurant_id, status, delivery_address, order_amount, delivery_charges,
+                                total_amount, payment_method, order_date)
+            SELECT %s || '-' || g, (%s::uuid[])[1 + g %% 20], (%s::text[])[1 + g %% 8], '{}',
+                   10 + g %% 50, 3, 13 + g %% 50, (ARRAY['CASH', 'CARD', 'WALLET'])[1 + g %% 3],
+                   NOW() - (g %% 525600) * INTERVAL '1 minute'
+            FROM generate_series(1, %s) g
+        """, (tag, restaurant_ids, STATUSES, count))
+        cur.execute("ANALYZE orders")
+    conn.commit()
+    return restaurant_ids
+
+
+def drop(conn, tag):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM orders WHERE order_id LIKE %s", (tag + "-%",))
+        cur.execute("DELETE FROM restaurants WHERE slug LIKE %s", (tag + "-%",))
+    conn.commit()
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(orders, batch, changes, iterations):
+    import main
+    from order_rollups import backfill, refresh
+
+    tag = "bench-" + uuid.uuid4().hex[:8]
+    conn = connect()
+    rows = []
+    end = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    month = {"start": end - timedelta(days=30), "end": end}
+
+    def timed(name, call):
+        stats = summarize(time_calls(call, iterations))
+        rows.append((name, f"{stats['p50']:.3f}", f"{stats['p95']:.3f}", f"{stats['p99']:.3f}"))
+
+    def query(sql, args=None):
+        def call():
+            with conn.cursor() as cur:
+                cur.execute(sql, args)
+                cur.fetchall()
+            conn.commit()
+        return call
+
+    def action(params):
+        return lambda: main.order_stats({"input": params})
+
+    try:
+        began = time.perf_counter()
+        seed(conn, tag, orders)
+        print(f"seeded {orders} orders in {time.perf_counter() - began:.1f}s")
+
+        rss_before = peak_rss_mb()
+        began = time.perf_counter()
+        applied = backfill(conn, batch, progress=lambda line: None)
+        backfill_seconds = time.perf_counter() - began
+        rss_after = peak_rss_mb()
+
+        for name, sql in SCAN_SQL.items():
+            timed(f"scan: {name}", query(sql, month))
+        timed("get_dashboard_orders_by_type", query("SELECT * FROM get_dashboard_orders_by_type()"))
+        timed("get_dashboard_sales_by_type", query("SELECT * FROM get_dashboard_sales_by_type()"))
+        timed("orderStats 30 days by day", action({
+            "from": month["start"].isoformat(), "to": end.isoformat(), "groupBy": "STATUS"}))
+        timed("orderStats 7 days by hour", action({
+            "from": (end - timedelta(days=7)).isoformat(), "to": end.isoformat(), "granularity": "HOUR"}))
+
+        # A wave of status changes, then the refresh that applies them
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE orders SET status = 'DELIVERED'
+                WHERE id IN (SELECT id FROM orders WHERE order_id LIKE %s AND status = 'PENDING' LIMIT %s)
+            """, (tag + "-%", changes))
+            changed = cur.rowcount
+        conn.commit()
+        began = time.perf_counter()
+        read = refresh(conn, batch)
+        refresh_ms = (time.perf_counter() - began) * 1000
+        began = time.perf_counter()
+        refresh(conn, batch)
+        idle_ms = (time.perf_counter() - began) * 1000
+
+        with conn.cursor() as cur:
+            cur.execute("SELECT status, payment_method, COUNT(*), SUM(total_amount) FROM orders GROUP BY 1, 2 ORDER BY 1, 2")
+            scanned = cur.fetchall()
+            cur.execute("""
+                SELECT status, payment_method, order_count, total_amount FROM order_rollup_totals
+                WHERE order_count <> 0 ORDER BY 1, 2
+            """)
+            rolled = cur.fetchall()
+        conn.commit()
+    finally:
+        drop(conn, tag)
+        refresh(conn, batch)
+        conn.close()
+
+    print(f"\nbackfill: {applied} orders in {backfill_seconds:.1f}s ({applied / backfill_seconds:.0f} orders/s, "
+          f"{batch} per transaction), client peak RSS {rss_before:.0f} MB -> {rss_after:.0f} MB")
+    print(f"refresh after {changed} status changes: {read} orders read in {refresh_ms:.1f} ms; "
+          f"with nothing changed: {idle_ms:.1f} ms")
+    print_table(f"Dashboard order stats in ms ({orders} seeded orders)", ["query", "p50", "p95", "p99"], rows)
+    print(f"\nrollup totals vs GROUP BY over orders: {'match' if scanned == rolled else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=1000000)
+    parser.add_argument("--batch", type=int, default=10000, help="orders per refresh transaction")
+    parser.add_argument("--changes", type=int, default=5000, help="orders changing status before the timed refresh")
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    run(args.orders, args.batch, args.changes, args.iterations)
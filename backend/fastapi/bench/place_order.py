@@ -0,0 +1,143 @@
+"""
+Order placement latency by order size: place_manual_order vs placeOrder.
+
+For orders of 1, 10 and 50 items (every other item with two addons), times
+
+  function   SELECT place_manual_order(...), which inserts row by row
+  statement  order_intake.place_order without a key, on a pooled (preparing) connection
+  action     the placeOrder handler with a fresh idempotency key
+  replay     placeOrder again with a key that was already used
+
+then fires --retries concurrent placeOrder calls sharing one key and checks
+that exactly one order was created. Orders go to a seeded restaurant that is
+removed afterwards with everything placed for it.
+
+    cd backend/fastapi && python -m bench.place_order --iterations 200
+"""
+import argparse
+import json
+import os
+import threading
+import uuid
+
+os.environ.setdefault("DB_POOL_MIN", "0")
+
+from bench.common import connect, print_table, summarize, time_calls
+
+SIZES = (1, 10, 50)
+
+
+def seed(conn, tag):
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO users (email, password, name, user_type)
+            VALUES (%s || '-customer@bench.local', 'bench', 'Bench customer', 'CUSTOMER')
+            RETURNING id::text
+        """, (tag,))
+        user_id = cur.fetchone()[0]
+        cur.execute("""
+            INSERT INTO restaurants (name, slug, address) VALUES ('Bench Orders', %s, '1 Bench Street')
+            RETURNING id::text
+        """, (tag + "-orders",))
+        restaurant_id = cur.fetchone()[0]
+    conn.commit()
+    return user_id, restaurant_id
+
+
+def drop(conn, tag, restaurant_id):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM orders WHERE restaurant_id = %s", (restaurant_id,))
+        cur.execute("DELETE FROM order_requests WHERE idempotency_key LIKE %s", (tag + "-%",))
+        cur.execute("DELETE FROM restaurants WHERE id = %s", (restaurant_id,))
+        cur.execute("DELETE FROM users WHERE email LIKE %s", (tag + "-%",))
+    conn.commit()
+
+
+def items(count):
+    """Order items in place_manual_order's shape, which placeOrder also accepts."""
+    return [{
+        "title": f"Bench dish {n}", "quantity": 1 + n % 3, "unit_price": "9.50", "total_price": str(9.5 * (1 + n % 3)),
+        "addons": [{"title": "Extra cheese", "price": "1.25"}, {"title": "Hot sauce", "price": "0.50"}] if n % 2 else [],
+    } for n in range(count)]
+
+
+def run(iterations, retries):
+    import main
+    from order_intake import place_order, validate_order
+
+    tag = "bench-" + uuid.uuid4().hex[:8]
+    conn = connect()
+    user_id, restaurant_id = seed(conn, tag)
+    keys = iter(range(10 ** 9))
+    rows = []
+    try:
+        for size in SIZES:
+            order = {
+                "userId": user_id, "restaurantId": restaurant_id, "items": items(size),
+                "deliveryAddress": {"street": "1 Bench Street", "city": "New York"}, "paymentMethod": "CASH",
+                "orderAmount": "100.00", "deliveryCharges": "3.00", "taxAmount": "5.00", "totalAmount": "108.00",
+            }
+
+            def function():
+                with conn.cursor() as cur:
+                    cur.execute("SELECT id FROM place_manual_order(%s, %s, %s, %s, %s, %s, %s, %s, %s)", (
+                        user_id, restaurant_id, json.dumps(order["items"]), json.dumps(order["deliveryAddress"]),
+                        "CASH", 3, 5, 108, 100))
+                    cur.fetchall()
+                conn.commit()
+
+            def statement():
+                pooled = main.db_pool.getconn()
+                try:
+                    with pooled.cursor() as cur:
+                        place_order(cur, validated)
+                    pooled.commit()
+                finally:
+                    main.db_pool.putconn(pooled)
+
+            def action(key=None):
+                return main.place_order_action({"input": {
+                    "order": order, "idempotencyKey": key or f"{tag}-{next(keys)}"}})
+
+            validated = validate_order(order)
+            replay_key = f"{tag}-replay-{size}"
+            action(replay_key)
+            for name, fn in (("function", function), ("statement", statement), ("action", action),
+                             ("replay", lambda: action(replay_key))):
+                stats = summarize(time_calls(fn, iterations))
+                rows.append((size, name, f"{stats['p50']:.3f}", f"{stats['p95']:.3f}", f"{stats['p99']:.3f}"))
+
+        # Concurrent retries of one order: all but one must be replays of it
+        key = f"{tag}-concurrent"
+        results = []
+
+        def retry():
+            results.append(main.place_order_action({"input": {"order": order, "idempotencyKey": key}}))
+
+        threads = [threading.Thread(target=retry) for _ in range(retries)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM order_requests r JOIN orders o ON o.id = r.order_id "
+                        "WHERE r.idempotency_key = %s", (key,))
+            stored = cur.fetchone()[0]
+        conn.commit()
+        placed = sum(1 for r in results if not r["replayed"])
+        same = len({r["order"]["_id"] for r in results}) == 1
+    finally:
+        drop(conn, tag, restaurant_id)
+        conn.close()
+    print_table(f"Order placement latency in ms ({iterations} orders per row)",
+                ["items", "path", "p50", "p95", "p99"], rows)
+    print(f"\n{retries} concurrent retries of one key: {placed} placed, {len(results) - placed} replayed, "
+          f"{stored} stored, same order returned: {same}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--retries", type=int, default=8)
+    args = parser.parse_args()
+    run(args.iterations, args.retries)
@@ -0,0 +1,67 @@
+"""
+Read endpoint latency with and without per-connection prepared statements.
+
+Seeds a vendor with N restaurants, then times restaurantByOwner and
+restaurantsPaginated (plain page, keyset page, search) through the
+handlers, once with PREPARED_STATEMENTS_MAX=0 (parse + plan on every call)
+and once with statements prepared. The difference is the per-call parse
+and planning time saved.
+
+    cd backend/fastapi && python -m bench.prepared_statements --restaurants 200
+"""
+import argparse
+import os
+
+os.environ.setdefault("DB_POOL_MAX", "1")  # one connection, so every call hits the same cache
+
+from bench.common import connect, print_table, summarize, time_calls
+from bench.restaurant_by_owner import drop_owner, seed_owner
+
+
+def run(restaurants, iterations):
+    import main
+    import prepared
+
+    calls = {
+        "restaurantByOwner": None,  # filled in once the owner exists
+        "restaurantsPaginated": lambda: main.restaurants_paginated({"input": {"page": 2, "limit": 20}}),
+        "restaurantsPaginated keyset": lambda: main.restaurants_paginated(
+            {"input": {"limit": 20, "cursor": "", "countMode": "none"}}),
+        "restaurantsPaginated search": lambda: main.restaurants_paginated(
+            {"input": {"page": 1, "limit": 20, "search": "Bench Store 1"}}),
+    }
+
+    conn = connect()
+    owner_id = seed_owner(conn, restaurants)
+    rows = []
+    try:
+        calls["restaurantByOwner"] = lambda: main.restaurant_by_owner({"input": {"id": owner_id}})
+        enabled = prepared.PREPARED_STATEMENTS_MAX or 100
+        for name, call in calls.items():
+            prepared.PREPARED_STATEMENTS_MAX = 0
+            plain = summarize(time_calls(call, iterations))
+            prepared.PREPARED_STATEMENTS_MAX = enabled
+            # Warm-up runs past PREPARE_THRESHOLD so the timed calls all use EXECUTE
+            cached = summarize(time_calls(call, iterations, warmup=prepared.PREPARE_THRESHOLD + 2))
+            rows.append((
+                name,
+                f"{plain['p50']:.3f}", f"{cached['p50']:.3f}",
+                f"{plain['p50'] - cached['p50']:.3f}",
+                f"{(plain['p50'] - cached['p50']) / plain['p50'] * 100:.0f}%",
+            ))
+        pooled = main.db_pool.getconn()
+        prepared_count = len(getattr(pooled, "prepared", {}))
+        main.db_pool.putconn(pooled)
+    finally:
+        drop_owner(conn, owner_id)
+        conn.close()
+    print_table(f"p50 latency in ms ({restaurants} restaurants, {prepared_count} statements prepared)",
+                ["endpoint", "plain", "prepared", "saved", "saved %"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--restaurants", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    run(args.restaurants, args.iterations)
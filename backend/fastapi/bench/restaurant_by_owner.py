@@ -0,0 +1,85 @@
+"""
+Latency of /restaurantByOwner as the number of restaurants per owner grows.
+
+Seeds a throwaway vendor with N restaurants (7 opening times each), calls the
+handler directly and removes the seeded rows afterwards.
+
+    cd backend/fastapi && python -m bench.restaurant_by_owner
+"""
+import argparse
+import uuid
+
+from bench.common import connect, print_table, summarize, time_calls
+
+SIZES = [1, 10, 50, 100, 250, 500]
+DAYS = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY"]
+
+
+def seed_owner(conn, count):
+    tag = uuid.uuid4().hex[:8]
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO users (email, password, name, user_type)
+            VALUES (%s, 'bench', 'Bench Owner', 'VENDOR')
+            RETURNING id
+        """, (f"bench-owner-{tag}@bench.local",))
+        owner_id = cur.fetchone()[0]
+        cur.execute("""
+            INSERT INTO restaurants (owner_id, name, slug, address, location)
+            SELECT %s, 'Bench Store ' || g, %s || '-' || g, g || ' Bench Street',
+                   ST_SetSRID(ST_MakePoint(-74 + random() / 10, 40.7 + random() / 10), 4326)
+            FROM generate_series(1, %s) g
+        """, (owner_id, f"bench-{tag}", count))
+        cur.execute("""
+            INSERT INTO restaurant_settings (restaurant_id, minimum_order, tax)
+            SELECT id, 10, 5 FROM restaurants WHERE owner_id = %s
+        """, (owner_id,))
+        cur.execute("""
+            INSERT INTO opening_times (restaurant_id, day, start_time, end_time)
+            SELECT r.id, d, '09:00', '22:00'
+            FROM restaurants r CROSS JOIN unnest(%s::text[]) d
+            WHERE r.owner_id = %s
+        """, (DAYS, owner_id))
+    conn.commit()
+    return str(owner_id)
+
+
+def drop_owner(conn, owner_id):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM restaurants WHERE owner_id = %s", (owner_id,))
+        cur.execute("DELETE FROM users WHERE id = %s", (owner_id,))
+    conn.commit()
+
+
+def run(sizes, iterations):
+    from main import restaurant_by_owner
+
+    conn = connect()
+    rows = []
+    try:
+        for count in sizes:
+            owner_id = seed_owner(conn, count)
+            try:
+                payload = {"input": {"id": owner_id}}
+                result = restaurant_by_owner(payload)
+                assert len(result["restaurants"]) == count
+                stats = summarize(time_calls(lambda: restaurant_by_owner(payload), iterations))
+            finally:
+                drop_owner(conn, owner_id)
+            rows.append((
+                count,
+                f"{stats['p50']:.2f}",
+                f"{stats['p95']:.2f}",
+                f"{stats['p50'] / count * 1000:.1f}",
+            ))
+    finally:
+        conn.close()
+    print_table("restaurantByOwner latency (ms)", ["restaurants", "p50", "p95", "us/restaurant"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    run(args.sizes, args.iterations)
@@ -0,0 +1,84 @@
+"""
+Search latency of /restaurantsPaginated on a large restaurants table.
+
+Seeds N restaurants with generated names and addresses (tagged so they can be
+removed afterwards), then times "contains" and "fuzzy" searches, including
+misspelled queries. Apply restaurants_search_index.sql first.
+
+    cd backend/fastapi && python -m bench.restaurant_search --rows 100000
+"""
+import argparse
+import uuid
+
+from bench.common import connect, print_table, summarize, time_calls
+
+ADJECTIVES = ["Golden", "Spicy", "Happy", "Royal", "Little", "Urban", "Rustic", "Blue", "Green", "Sunny"]
+NOUNS = ["Dragon", "Garden", "Kitchen", "Bistro", "Grill", "Pizza", "Noodle", "Burger", "Taco", "Curry"]
+STREETS = ["Main", "Oak", "Maple", "Cedar", "Elm", "Pine", "Lake", "Hill", "Park", "River"]
+
+# (label, search, searchMode)
+QUERIES = [
+    ("exact word", "Dragon", "contains"),
+    ("substring", "urge", "contains"),
+    ("address", "Maple Street", "contains"),
+    ("typo", "Dragn Gardn", "fuzzy"),
+    ("typo", "Spicey Nodle", "fuzzy"),
+    ("no match", "zzqxv", "fuzzy"),
+]
+
+
+def seed(conn, rows):
+    tag = f"bench-search-{uuid.uuid4().hex[:8]}"
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO restaurants (name, slug, address)
+            SELECT
+                (%s::text[])[1 + g %% 10] || ' ' || (%s::text[])[1 + (g / 10) %% 10] || ' ' || g,
+                %s || '-' || g,
+                g || ' ' || (%s::text[])[1 + (g / 100) %% 10] || ' Street'
+            FROM generate_series(1, %s) g
+        """, (ADJECTIVES, NOUNS, tag, STREETS, rows))
+        cur.execute("ANALYZE restaurants")
+    conn.commit()
+    return tag
+
+
+def cleanup(conn, tag):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM restaurants WHERE slug LIKE %s", (tag + "-%",))
+    conn.commit()
+
+
+def run(rows, iterations, keep):
+    from main import restaurants_paginated
+
+    conn = connect()
+    tag = seed(conn, rows)
+    try:
+        results = []
+        for label, search, mode in QUERIES:
+            payload = {"input": {"page": 1, "limit": 20, "search": search, "searchMode": mode}}
+            first = restaurants_paginated(payload)
+            stats = summarize(time_calls(lambda: restaurants_paginated(payload), iterations))
+            results.append((
+                label, mode, search, first["totalCount"],
+                f"{stats['p50']:.2f}", f"{stats['p95']:.2f}", f"{stats['p99']:.2f}",
+            ))
+    finally:
+        if not keep:
+            cleanup(conn, tag)
+        conn.close()
+    print_table(
+        f"restaurantsPaginated search latency (ms), {rows} seeded restaurants",
+        ["query", "mode", "search", "matches", "p50", "p95", "p99"],
+        results,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows")
+    args = parser.parse_args()
+    run(args.rows, args.iterations, args.keep)
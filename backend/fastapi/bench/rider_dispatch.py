@@ -0,0 +1,79 @@
+"""
+Nearest-rider lookup latency on the in-memory rider index.
+
+No database needed: N available riders are scattered over a city-sized
+area (split into zones), loaded into a RiderIndex, and nearest() is timed
+for random pickup points against a linear scan over every rider. Each
+result is checked against the scan first.
+
+    cd backend/fastapi && python -m bench.rider_dispatch --riders 10000
+"""
+import argparse
+import heapq
+import os
+import random
+
+os.environ.setdefault("DB_POOL_MIN", "0")
+
+from bench.common import print_table, summarize, time_calls
+from dispatch import DISPATCH_CELL_DEGREES, RiderIndex, distance_m
+
+# Roughly 30 x 30 km around a city center
+CENTER = (40.73, -73.99)
+SPAN = 0.27
+
+
+def make_riders(count, zones, rng):
+    return [(
+        f"rider-{n}",
+        CENTER[0] + rng.uniform(-SPAN / 2, SPAN / 2),
+        CENTER[1] + rng.uniform(-SPAN / 2, SPAN / 2),
+        f"zone-{n % zones}",
+    ) for n in range(count)]
+
+
+def scan(riders, lat, lng, k, zone_id=None):
+    candidates = ((distance_m(lat, lng, rlat, rlng), rider_id) for rider_id, rlat, rlng, zone in riders
+                  if zone_id is None or zone == zone_id)
+    return [rider_id for _, rider_id in heapq.nsmallest(k, candidates)]
+
+
+def run(count, zones, ks, iterations, cell, seed):
+    rng = random.Random(seed)
+    riders = make_riders(count, zones, rng)
+    index = RiderIndex(cell_degrees=cell)
+    index.replace(riders)
+    points = [(CENTER[0] + rng.uniform(-SPAN / 2, SPAN / 2), CENTER[1] + rng.uniform(-SPAN / 2, SPAN / 2))
+              for _ in range(256)]
+
+    rows = []
+    for k in ks:
+        for zone_id in (None, "zone-0"):
+            for lat, lng in points[:20]:
+                found = [r[0] for r in index.nearest(lat, lng, k, zone_id=zone_id)]
+                assert found == scan(riders, lat, lng, k, zone_id), (lat, lng, k, zone_id)
+
+            queries = iter(points * (iterations // len(points) + 2))
+            indexed = summarize(time_calls(lambda: index.nearest(*next(queries), k, zone_id=zone_id), iterations))
+            queries = iter(points * (iterations // 10 // len(points) + 2))
+            linear = summarize(time_calls(lambda: scan(riders, *next(queries), k, zone_id), max(10, iterations // 10)))
+            rows.append((
+                k, zone_id or "any",
+                f"{indexed['p50']:.3f}", f"{indexed['p99']:.3f}",
+                f"{linear['p50']:.3f}",
+                f"{linear['p50'] / indexed['p50']:.0f}x",
+            ))
+    print_table(f"nearest() latency in ms ({count} riders, {zones} zones, {cell} degree cells)",
+                ["k", "zone", "index p50", "index p99", "scan p50", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--riders", type=int, default=10000)
+    parser.add_argument("--zones", type=int, default=4)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--cell", type=float, default=DISPATCH_CELL_DEGREES)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    run(args.riders, args.zones, args.k, args.iterations, args.cell, args.seed)
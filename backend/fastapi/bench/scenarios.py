@@ -0,0 +1,325 @@
+"""
+Hasura action payloads for every FastAPI handler, plus the seed data they run against.
+
+Every row the load test creates is tagged with the run's tag (emails, slugs,
+titles) so cleanup() can remove it, including rows created by the create*
+scenarios themselves.
+"""
+import base64
+import os
+import struct
+import uuid
+import zlib
+from collections import namedtuple
+
+from bench.common import connect
+
+DAYS = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY"]
+
+# name: Hasura action name; path: FastAPI route; build(seed, i) -> httpx request kwargs
+Scenario = namedtuple("Scenario", ["name", "path", "build", "kind"])
+
+
+class Seed:
+    """Ids of the rows seeded for one run."""
+
+    def __init__(self, tag):
+        self.tag = tag
+        self.owner_id = None
+        self.restaurant_ids = []
+        self.users = {}  # user_type -> [ids]
+        self.shop_type_ids = []
+        self.cuisine_ids = []
+        self.images = []
+
+
+def action(name, input, role="admin"):
+    """The body Hasura posts to an action handler."""
+    return {
+        "action": {"name": name},
+        "input": input,
+        "session_variables": {"x-hasura-role": role},
+        "request_query": "",
+    }
+
+
+def seed(stores=50, users_per_type=50, images=8):
+    tag = f"lt-{uuid.uuid4().hex[:8]}"
+    result = Seed(tag)
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            for user_type in ("VENDOR", "STAFF", "RIDER", "CUSTOMER"):
+                cur.execute("""
+                    INSERT INTO users (email, password, name, user_type)
+                    SELECT %s || '-' || lower(%s) || '-' || g || '@bench.local', 'bench', 'Load ' || g, %s
+                    FROM generate_series(1, %s) g
+                    RETURNING id
+                """, (tag, user_type, user_type, users_per_type + 1))
+                result.users[user_type] = [str(r[0]) for r in cur.fetchall()]
+            # First vendor owns the seeded stores; the rest are edited and deleted
+            result.owner_id = result.users["VENDOR"].pop(0)
+
+            cur.execute("""
+                INSERT INTO restaurants (owner_id, name, slug, address, location, cuisines)
+                SELECT %s, 'Load Store ' || g, %s || '-seed-' || g, g || ' Load Street',
+                       ST_SetSRID(ST_MakePoint(-74 + random() / 10, 40.7 + random() / 10), 4326),
+                       ARRAY['Pizza', 'Burgers']
+                FROM generate_series(1, %s) g
+                RETURNING id
+            """, (result.owner_id, tag, stores))
+            result.restaurant_ids = [str(r[0]) for r in cur.fetchall()]
+            cur.execute("""
+                INSERT INTO restaurant_settings (restaurant_id, minimum_order, tax)
+                SELECT unnest(%s::uuid[]), 10, 5
+            """, (result.restaurant_ids,))
+            cur.execute("""
+                INSERT INTO opening_times (restaurant_id, day, start_time, end_time)
+                SELECT r, d, '09:00', '22:00'
+                FROM unnest(%s::uuid[]) r CROSS JOIN unnest(%s::text[]) d
+            """, (result.restaurant_ids, DAYS))
+
+            cur.execute("""
+                INSERT INTO shop_types (title, description)
+                SELECT %s || ' shop ' || g, 'load test' FROM generate_series(1, 10) g
+                RETURNING id
+            """, (tag,))
+            result.shop_type_ids = [str(r[0]) for r in cur.fetchall()]
+            cur.execute("""
+                INSERT INTO cuisines (title, description, shop_type_id)
+                SELECT %s || ' cuisine ' || g, 'load test', (%s::uuid[])[1 + g %% 10]
+                FROM generate_series(1, 20) g
+                RETURNING id
+            """, (tag, result.shop_type_ids))
+            result.cuisine_ids = [str(r[0]) for r in cur.fetchall()]
+        conn.commit()
+    finally:
+        conn.close()
+    result.images = [_png(64, 64, n) for n in range(images)]
+    return result
+
+
+def cleanup(seed):
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            pattern = seed.tag + "-%"
+            cur.execute("SELECT id FROM users WHERE email LIKE %s", (pattern,))
+            user_ids = [r[0] for r in cur.fetchall()]
+            cur.execute("SELECT to_regclass('orders') IS NOT NULL")
+            if cur.fetchone()[0]:
+                cur.execute("DELETE FROM orders WHERE restaurant_id = ANY(%s::uuid[]) OR user_id = ANY(%s::uuid[])",
+                            (seed.restaurant_ids, [str(u) for u in user_ids]))
+            cur.execute("DELETE FROM restaurants WHERE slug LIKE %s OR owner_id = ANY(%s::uuid[])",
+                        (pattern, [str(u) for u in user_ids]))
+            cur.execute("SELECT to_regclass('riders_data') IS NOT NULL")
+            if cur.fetchone()[0]:
+                cur.execute("DELETE FROM riders_data WHERE user_id = ANY(%s::uuid[])", ([str(u) for u in user_ids],))
+            cur.execute("DELETE FROM users WHERE email LIKE %s", (pattern,))
+            cur.execute("DELETE FROM cuisines WHERE title LIKE %s", (seed.tag + " %",))
+            cur.execute("DELETE FROM shop_types WHERE title LIKE %s", (seed.tag + " %",))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _png(width, height, n):
+    """A small valid RGB PNG with a per-`n` gradient, so uploads differ in content."""
+    raw = b"".join(
+        b"\x00" + bytes((x * 4 + n * 29) % 256 for x in range(width) for _ in range(3))
+        for y in range(height)
+    )
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw))
+            + chunk(b"IEND", b""))
+
+
+def _pick(items, i):
+    return items[i % len(items)]
+
+
+def _store(seed, i, label):
+    return {
+        "name": f"Load {label} Store {i}",
+        "address": f"{i} Load Avenue",
+        "slug": f"{seed.tag}-{label}-{i}",
+        "deliveryTime": 30,
+        "minimumOrder": 10,
+        "tax": 5,
+        "cuisines": ["Pizza"],
+        "openingTimes": [{"day": d, "startTime": "09:00", "endTime": "22:00"} for d in DAYS],
+    }
+
+
+def _person(seed, kind, i):
+    return {
+        "name": f"Load {kind} {i}",
+        "email": f"{seed.tag}-new{kind}-{i}@bench.local",
+        "password": "bench",
+        "phone": f"+1555{i:07d}",
+    }
+
+
+def _order(seed, i, items):
+    return {
+        "userId": _pick(seed.users["CUSTOMER"], i),
+        "restaurantId": _pick(seed.restaurant_ids, i),
+        "deliveryAddress": {"street": f"{i} Load Street", "city": "New York"},
+        "paymentMethod": "CASH",
+        "items": [{
+            "title": f"Load dish {n}", "quantity": 1 + n % 3, "unitPrice": "9.50", "totalPrice": str(9.5 * (1 + n % 3)),
+            "addons": [{"title": "Extra cheese", "price": "1.25"}] if n % 2 else [],
+        } for n in range(items)],
+        "orderAmount": "100.00",
+        "deliveryCharges": "3.00",
+        "taxAmount": "5.00",
+        "totalAmount": "108.00",
+    }
+
+
+def _place_order(seed, i):
+    return {"order": _order(seed, i, 1 + i % 10), "idempotencyKey": f"{seed.tag}-order-{i}"}
+
+
+def _json(name, input):
+    return lambda seed, i: {"json": action(name, input(seed, i))}
+
+
+def _upload(seed, i):
+    image = base64.b64encode(_pick(seed.images, i)).decode()
+    return {"json": action("uploadImageToS3", {"image": "data:image/png;base64," + image})}
+
+
+SCENARIOS = [
+    # Reads
+    Scenario("restaurantByOwner", "/restaurantByOwner",
+             _json("restaurantByOwner", lambda s, i: {"id": s.owner_id}), "read"),
+    Scenario("restaurantsPaginated", "/restaurantsPaginated",
+             _json("restaurantsPaginated", lambda s, i: {"page": 1 + i % 5, "limit": 10}), "read"),
+    Scenario("restaurantsPaginatedSearch", "/restaurantsPaginated",
+             _json("restaurantsPaginated", lambda s, i: {"page": 1, "limit": 10, "search": "Load Store 1"}), "read"),
+    Scenario("fetchShopTypes", "/fetchShopTypes",
+             _json("fetchShopTypes", lambda s, i: {"pagination": {"page": 1, "size": 10}}), "read"),
+    Scenario("fetchCuisines", "/fetchCuisines", _json("fetchCuisines", lambda s, i: {}), "read"),
+    Scenario("ownerLogin", "/ownerLogin",
+             _json("ownerLogin", lambda s, i: {"email": "admin@enatega.com", "password": "123456"}), "read"),
+    Scenario("nearestRiders", "/nearestRiders",
+             _json("nearestRiders", lambda s, i: {"restaurantId": _pick(s.restaurant_ids, i), "limit": 5}), "read"),
+    Scenario("nearbyRestaurants", "/nearbyRestaurants",
+             _json("nearbyRestaurants", lambda s, i: {
+                 "location": {"latitude": 40.7 + (i % 100) / 1000, "longitude": -74 + (i * 7 % 100) / 1000},
+                 "radius": 5000, "page": 1 + i % 3, "limit": 20}), "read"),
+    Scenario("restaurantsDeliveringTo", "/restaurantsDeliveringTo",
+             _json("restaurantsDeliveringTo", lambda s, i: {"location": {
+                 "latitude": 40.7 + (i % 100) / 1000, "longitude": -74 + (i * 7 % 100) / 1000}}), "read"),
+    Scenario("riderLocations", "/riderLocations",
+             _json("riderLocations", lambda s, i: {"riderIds": s.users["RIDER"][:10]}), "read"),
+    Scenario("orderStats", "/orderStats",
+             _json("orderStats", lambda s, i: {
+                 "from": "2026-01-01", "to": "2026-02-01" if i % 2 else "2026-01-08",
+                 "granularity": "DAY" if i % 2 else "HOUR", "groupBy": ("STATUS", "PAYMENT_METHOD", None)[i % 3],
+                 "restaurantId": _pick(s.restaurant_ids, i) if i % 4 == 3 else None}), "read"),
+    Scenario("batchDashboard", "/batch",
+             _json("batch", lambda s, i: {"actions": [
+                 {"name": "fetchShopTypes", "input": {"pagination": {"page": 1, "size": 10}}},
+                 {"name": "fetchCuisines", "input": {}},
+                 {"name": "restaurantsPaginated", "input": {"page": 1 + i % 5, "limit": 10}},
+             ]}), "read"),
+
+    # Writes
+    Scenario("createStore", "/createStore",
+             _json("createStore", lambda s, i: {"owner": s.owner_id, "restaurant": _store(s, i, "new")}), "write"),
+    Scenario("bulkCreateStores", "/bulkCreateStores",
+             _json("bulkCreateStores", lambda s, i: {
+                 "owner": s.owner_id,
+                 "restaurants": [_store(s, i * 20 + n, "bulk") for n in range(20)],
+             }), "write"),
+    Scenario("editStore", "/editStore",
+             _json("editStore", lambda s, i: {"restaurant": {
+                 "_id": _pick(s.restaurant_ids, i),
+                 "name": f"Load Store edited {i}",
+                 "openingTimes": [
+                     {"day": d, "startTime": "09:00", "endTime": "23:00" if d == DAYS[i % 7] else "22:00"}
+                     for d in DAYS
+                 ],
+             }}), "write"),
+    Scenario("updateOpeningTimes", "/updateOpeningTimes",
+             _json("updateOpeningTimes", lambda s, i: {
+                 "restaurantIds": s.restaurant_ids,
+                 "openingTimes": [{"day": "SUNDAY", "startTime": "00:00", "endTime": "00:00", "isClosed": i % 2 == 0}],
+             }), "write"),
+    Scenario("updateDeliveryBoundsAndLocation", "/updateDeliveryBoundsAndLocation",
+             _json("updateDeliveryBoundsAndLocation", lambda s, i: {
+                 "id": _pick(s.restaurant_ids, i),
+                 "location": {"latitude": 40.7 + (i % 100) / 1000, "longitude": -74 + (i % 100) / 1000},
+                 "address": f"{i} Moved Street",
+                 "boundType": "RADIUS",
+                 "circleBounds": {"radius": 2000 + i % 5 * 500},
+             }), "write"),
+    Scenario("placeOrder", "/placeOrder",
+             # Every fifth call retries the previous order, as a client would after a timeout
+             _json("placeOrder", lambda s, i: _place_order(s, i - 1 if i % 5 == 4 else i)), "write"),
+    Scenario("createVendor", "/createVendor",
+             _json("createVendor", lambda s, i: {"vendorInput": _person(s, "vendor", i)}), "write"),
+    Scenario("editVendor", "/editVendor",
+             _json("editVendor", lambda s, i: {"vendorInput": {
+                 "_id": _pick(s.users["VENDOR"], i), "name": f"Load vendor edited {i}"}}), "write"),
+    Scenario("createStaff", "/createStaff",
+             _json("createStaff", lambda s, i: {"staffInput": dict(
+                 _person(s, "staff", i), isActive=True, permissions=["Stores"])}), "write"),
+    Scenario("editStaff", "/editStaff",
+             _json("editStaff", lambda s, i: {"staffInput": {
+                 "_id": _pick(s.users["STAFF"], i), "name": f"Load staff edited {i}", "permissions": ["Orders"]}}),
+             "write"),
+    Scenario("createRider", "/createRider",
+             _json("createRider", lambda s, i: {"riderInput": {
+                 "name": f"Load rider {i}", "username": f"{s.tag}-newrider-{i}@bench.local", "password": "bench",
+                 "phone": f"+1556{i:07d}", "available": True, "vehicleType": "BIKE"}}), "write"),
+    Scenario("editRider", "/editRider",
+             _json("editRider", lambda s, i: {"riderInput": {
+                 "_id": _pick(s.users["RIDER"], i), "name": f"Load rider edited {i}", "available": i % 2 == 0}}),
+             "write"),
+    Scenario("updateRiderLocations", "/updateRiderLocations",
+             _json("updateRiderLocations", lambda s, i: {"pings": [{
+                 "riderId": _pick(s.users["RIDER"], i + n),
+                 "latitude": 40.7 + (i % 100) / 1000, "longitude": -74 + (n % 100) / 1000,
+             } for n in range(5)]}), "write"),
+    Scenario("createUser", "/createUser",
+             _json("createUser", lambda s, i: {"userInput": _person(s, "user", i)}), "write"),
+    Scenario("editUser", "/editUser",
+             _json("editUser", lambda s, i: {"userInput": {
+                 "_id": _pick(s.users["CUSTOMER"], i), "name": f"Load user edited {i}"}}), "write"),
+    Scenario("createShopType", "/createShopType",
+             _json("createShopType", lambda s, i: {"dto": {"name": f"{s.tag} new shop {i}", "description": "x"}}),
+             "write"),
+    Scenario("updateShopType", "/updateShopType",
+             _json("updateShopType", lambda s, i: {"dto": {
+                 "_id": _pick(s.shop_type_ids, i), "name": f"{s.tag} shop edited {i}"}}), "write"),
+    Scenario("createCuisine", "/createCuisine",
+             _json("createCuisine", lambda s, i: {"cuisineInput": {
+                 "name": f"{s.tag} new cuisine {i}", "shopTypeId": _pick(s.shop_type_ids, i)}}), "write"),
+    Scenario("editCuisine", "/editCuisine",
+             _json("editCuisine", lambda s, i: {"cuisineInput": {
+                 "_id": _pick(s.cuisine_ids, i), "name": f"{s.tag} cuisine edited {i}",
+                 "shopTypeId": _pick(s.shop_type_ids, i)}}), "write"),
+    Scenario("uploadImageToS3", "/uploadImageToS3", _upload, "write"),
+
+    # Deletes run last so they don't empty the data the other scenarios use
+    Scenario("deleteStore", "/deleteStore",
+             _json("deleteStore", lambda s, i: {"id": _pick(s.restaurant_ids, i)}), "write"),
+    Scenario("deleteVendor", "/deleteVendor",
+             _json("deleteVendor", lambda s, i: {"id": _pick(s.users["VENDOR"], i)}), "write"),
+    Scenario("deleteShopType", "/deleteShopType",
+             _json("deleteShopType", lambda s, i: {"id": _pick(s.shop_type_ids, i)}), "write"),
+    Scenario("deleteCuisine", "/deleteCuisine",
+             _json("deleteCuisine", lambda s, i: {"id": _pick(s.cuisine_ids, i)}), "write"),
+]
+
+
+def static_files(upload_dir):
+    return set(os.listdir(upload_dir)) if os.path.isdir(upload_dir) else set()
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class CatalogCache:
+    """
+    Versioned in-memory read-through cache for small, rarely changing catalogs
+    (shop types, cuisines).
+
+    Entries expire after `ttl` seconds and at most `max_entries` are kept (LRU).
+    Writers call invalidate(), which bumps the version and drops every entry;
+    a load that started before an invalidation is never stored.
+    The cache is per process, so with several workers the TTL bounds how long
+    another worker can serve data from before a write.
+
+    With etags=False no ETag is computed (get() returns None for it), for
+    callers that never send one.
+    """
+
+    def __init__(self, ttl=300.0, max_entries=256, etags=True):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.etags = etags
+        self.version = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, etag, expires_at)
+
+    def get(self, key, loader):
+        """Return (value, etag) for `key`, calling `loader()` on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[2] > now:
+                self._entries.move_to_end(key)
+                return entry[0], entry[1]
+            version = self.version
+
+        value = loader()
+        etag = make_etag(value) if self.etags else None
+
+        with self._lock:
+            if version == self.version:
+                self._entries[key] = (value, etag, time.monotonic() + self.ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value, etag
+
+    def invalidate(self, key=None):
+        """Drop every entry, or only `key`."""
+        with self._lock:
+            self.version += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+def make_etag(value):
+    body = json.dumps(value, sort_keys=True, default=str).encode()
+    return '"%s"' % hashlib.sha1(body).hexdigest()
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag == etag or tag == "W/" + etag:
+            return True
+    return False
+
+
+catalog_cache = CatalogCache(
+    ttl=float(os.getenv("CATALOG_CACHE_TTL", "300")),
+    max_entries=int(os.getenv("CATALOG_CACHE_SIZE", "256")),
+)
@@ -0,0 +1,218 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import psycopg2
+from psycopg2 import extensions, pool
+
+
+class PoolTimeout(pool.PoolError):
+    """Raised when a connection could not be checked out in time."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe connection pool with a bounded wait queue.
+
+    Drop-in replacement for psycopg2's SimpleConnectionPool (getconn/putconn/closeall).
+    When every connection is busy, callers wait up to `timeout` seconds instead of
+    failing immediately; at most `max_waiters` callers may wait at once.
+    Idle connections are health-checked on checkout and replaced if broken.
+
+    `connection_factory` and `cursor_factory` are passed to every new
+    connection, and `on_wait(seconds)`
+    is called after each successful checkout with the time spent acquiring it.
+
+    Inside `with pool.pinned():` getconn()/putconn() in the same context reuse
+    one checked-out connection, so several handlers can run back to back on it.
+    """
+
+    def __init__(self, minconn, maxconn, dsn, timeout=5.0, max_waiters=50, check_interval=30.0,
+                 connection_factory=None, cursor_factory=None, on_wait=None):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("invalid pool size: minconn=%s maxconn=%s" % (minconn, maxconn))
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.dsn = dsn
+        self.timeout = timeout
+        self.max_waiters = max_waiters
+        self.check_interval = check_interval
+        self.connection_factory = connection_factory
+        self.cursor_factory = cursor_factory
+        self.on_wait = on_wait
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conn, returned_at)
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self._pinned = ContextVar(f"pinned_connection_{id(self)}", default=None)
+
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._rejected = 0
+        self._reconnects = 0
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def _connect(self):
+        kwargs = {}
+        if self.connection_factory is not None:
+            kwargs["connection_factory"] = self.connection_factory
+        if self.cursor_factory is not None:
+            kwargs["cursor_factory"] = self.cursor_factory
+        return psycopg2.connect(self.dsn, **kwargs)
+
+    def _check(self, conn, returned_at):
+        """Return a usable connection, reconnecting if `conn` is broken."""
+        if not conn.closed and time.monotonic() - returned_at < self.check_interval:
+            return conn
+        if not conn.closed:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+                return conn
+            except psycopg2.Error:
+                try:
+                    conn.close()
+                except psycopg2.Error:
+                    pass
+        with self._cond:
+            self._reconnects += 1
+        return self._connect()
+
+    def getconn(self):
+        pinned = self._pinned.get()
+        if pinned is not None:
+            return pinned
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise pool.PoolError("connection pool is closed")
+                if self._idle:
+                    # LIFO keeps the most recently used connections warm
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._size < self.maxconn:
+                    self._size += 1
+                    conn, returned_at = None, None
+                    break
+                if self._waiting >= self.max_waiters:
+                    self._rejected += 1
+                    raise PoolTimeout("connection pool wait queue is full")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout("timed out waiting for a database connection")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        # Connecting and health checks happen outside the lock
+        try:
+            conn = self._connect() if conn is None else self._check(conn, returned_at)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._checkouts += 1
+            self._wait_total += waited
+            if waited > self._wait_max:
+                self._wait_max = waited
+        if self.on_wait is not None:
+            self.on_wait(waited)
+        return conn
+
+    def putconn(self, conn, close=False):
+        if conn is self._pinned.get():
+            # Keep it for the next caller, but never leave a transaction open
+            if not conn.closed and conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    pass
+            return
+        if not close and not conn.closed:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+
+        with self._cond:
+            if close or conn.closed or self._closed:
+                self._size -= 1
+                if not conn.closed:
+                    conn.close()
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def pinned(self):
+        """Check out one connection and hand it to every getconn() in this context."""
+        conn = self.getconn()
+        token = self._pinned.set(conn)
+        try:
+            yield conn
+        finally:
+            self._pinned.reset(token)
+            self.putconn(conn)
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                if not conn.closed:
+                    conn.close()
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "inUse": self._size - len(self._idle),
+                "waiting": self._waiting,
+                "minSize": self.minconn,
+                "maxSize": self.maxconn,
+                "checkouts": self._checkouts,
+                "waitSecondsTotal": round(self._wait_total, 6),
+                "waitSecondsMax": round(self._wait_max, 6),
+                "timeouts": self._timeouts,
+                "rejected": self._rejected,
+                "reconnects": self._reconnects,
+            }
+
+
+def pool_from_env(dsn, **kwargs):
+    return ConnectionPool(
+        int(os.getenv("DB_POOL_MIN", "1")),
+        int(os.getenv("DB_POOL_MAX", "10")),
+        dsn,
+        timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+        max_waiters=int(os.getenv("DB_POOL_MAX_WAITERS", "50")),
+        check_interval=float(os.getenv("DB_POOL_CHECK_INTERVAL", "30")),
+        **kwargs,
+    )
@@ -0,0 +1,127 @@
+import os
+
+from catalog_cache import CatalogCache
+
+# Geohash length of the "who delivers here" cache cells (6 is about 1.2 x 0.6 km)
+DELIVERY_GEOHASH_PRECISION = int(os.getenv("DELIVERY_GEOHASH_PRECISION", "6"))
+# Seconds a cached cell is served; bounds how long another worker can miss a bounds change
+DELIVERY_CACHE_TTL = float(os.getenv("DELIVERY_CACHE_TTL", "60"))
+# Geohash length of the nearbyRestaurants cache cells (6 is about 1.2 x 0.6 km)
+NEARBY_GEOHASH_PRECISION = int(os.getenv("NEARBY_GEOHASH_PRECISION", "6"))
+# Seconds a cached nearby list is served
+NEARBY_CACHE_TTL = float(os.getenv("NEARBY_CACHE_TTL", "30"))
+# Restaurants cached per cell, closest to the cell center first
+NEARBY_CACHE_CANDIDATES = int(os.getenv("NEARBY_CACHE_CANDIDATES", "300"))
+# Most points allowed in a custom delivery polygon
+MAX_BOUNDS_POINTS = int(os.getenv("MAX_BOUNDS_POINTS", "1000"))
+# Largest delivery radius accepted, in meters
+MAX_DELIVERY_RADIUS = float(os.getenv("MAX_DELIVERY_RADIUS", "50000"))
+
+BOUND_TYPES = {"RADIUS", "CIRCLE", "POLYGON", "ZONE"}
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+class BoundsError(ValueError):
+    """Raised for delivery bounds input that cannot become a polygon."""
+
+
+def geohash(lat, lng, precision):
+    """Geohash of a point, `precision` characters long."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def geohash_bounds(cell):
+    """(min_lng, min_lat, max_lng, max_lat) of a geohash cell."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lng_range[0], lat_range[0], lng_range[1], lat_range[1]
+
+
+def contains(rings, lng, lat):
+    """
+    Whether GeoJSON polygon rings ([[lng, lat], ...], exterior first) contain
+    the point. Even-odd ray casting, so holes are excluded; edges are treated
+    as straight lines in lng/lat, which is what a delivery area drawn on a map
+    means.
+    """
+    inside = False
+    for ring in rings:
+        x1, y1 = ring[-1][0], ring[-1][1]
+        for point in ring:
+            x2, y2 = point[0], point[1]
+            if (y2 > lat) != (y1 > lat) and lng < (x1 - x2) * (lat - y2) / (y1 - y2) + x2:
+                inside = not inside
+            x1, y1 = x2, y2
+    return inside
+
+
+def polygon_wkt(rings):
+    """WKT for [[[lng, lat], ...], ...] rings (the deliveryBounds coordinates), closing open rings."""
+    if not isinstance(rings, list) or not rings:
+        raise BoundsError("bounds must be a list of rings of [longitude, latitude] points")
+    parts = []
+    total = 0
+    for ring in rings:
+        if not isinstance(ring, list):
+            raise BoundsError("bounds must be a list of rings of [longitude, latitude] points")
+        points = []
+        for point in ring:
+            try:
+                lng, lat = float(point[0]), float(point[1])
+            except (TypeError, ValueError, IndexError, KeyError):
+                raise BoundsError("bounds points must be [longitude, latitude] pairs")
+            if not (-180 <= lng <= 180 and -90 <= lat <= 90):
+                raise BoundsError("bounds point is out of range")
+            points.append((lng, lat))
+        if points and points[0] != points[-1]:
+            points.append(points[0])
+        if len(points) < 4:
+            raise BoundsError("each bounds ring needs at least 3 distinct points")
+        total += len(points)
+        parts.append("(" + ", ".join(f"{lng!r} {lat!r}" for lng, lat in points) + ")")
+    if total > MAX_BOUNDS_POINTS:
+        raise BoundsError(f"bounds may have at most {MAX_BOUNDS_POINTS} points")
+    return "POLYGON(" + ", ".join(parts) + ")"
+
+
+# Cell geohash -> restaurants whose delivery bounds reach the cell; invalidated
+# whenever this worker changes delivery bounds or a store's visibility. Neither
+# endpoint sends an ETag, so none is computed.
+delivery_cache = CatalogCache(ttl=DELIVERY_CACHE_TTL, max_entries=int(os.getenv("DELIVERY_CACHE_SIZE", "10000")),
+                              etags=False)
+# (cell geohash, radius) -> active restaurants closest to the cell center
+nearby_cache = CatalogCache(ttl=NEARBY_CACHE_TTL, max_entries=int(os.getenv("NEARBY_CACHE_SIZE", "10000")),
+                            etags=False)
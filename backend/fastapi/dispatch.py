@@ -0,0 +1,242 @@
+import heapq
+import math
+import os
+import threading
+import time
+
+# Grid cell size of the rider index, in degrees (0.01 is about 1.1 km north-south)
+DISPATCH_CELL_DEGREES = float(os.getenv("DISPATCH_CELL_DEGREES", "0.01"))
+# Seconds before the rider index is reloaded from the database; bounds how long
+# changes made by another worker or outside the API take to show up here
+DISPATCH_INDEX_TTL = float(os.getenv("DISPATCH_INDEX_TTL", "10"))
+# Serve nearestRiders from the in-memory index; 0 always runs the PostGIS KNN query
+DISPATCH_INDEX_ENABLED = os.getenv("DISPATCH_INDEX_ENABLED", "1") == "1"
+# Farthest rider nearestRiders returns when no maxDistance is given, in meters
+DISPATCH_MAX_DISTANCE = float(os.getenv("DISPATCH_MAX_DISTANCE", "50000"))
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+
+def distance_m(lat1, lng1, lat2, lng2):
+    """Great-circle (haversine) distance in meters, as ST_Distance on a sphere."""
+    p1 = math.radians(lat1)
+    p2 = math.radians(lat2)
+    a = (math.sin((p2 - p1) / 2) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class RiderIndex:
+    """
+    In-memory grid index of available riders with a known location.
+
+    Riders are bucketed by (lat, lng) grid cell; nearest() searches cells
+    outward from the query point and stops once no unvisited cell can hold
+    a closer rider. All methods are thread-safe.
+
+    The index is rebuilt from the database with replace() every `ttl`
+    seconds and kept current in between with upsert()/remove() as this
+    process changes riders. Writes made while a reload query is running are
+    replayed on top of its result, so a reload never undoes them.
+    """
+
+    def __init__(self, cell_degrees=0.01, ttl=10.0):
+        self.cell = cell_degrees
+        self.ttl = ttl
+        self.loaded_at = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._riders = {}  # rider_id -> (lat, lng, zone_id, cell)
+        self._cells = {}  # cell -> {rider_id: (lat, lng, zone_id)}
+        self._bounds = None  # (min row, max row, min col, max col) of cells ever used since the last reload
+        self._loading = None  # writes seen since the running reload started
+
+    def __len__(self):
+        return len(self._riders)
+
+    def _cell(self, lat, lng):
+        return int(math.floor(lat / self.cell)), int(math.floor(lng / self.cell))
+
+    def stale(self):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl
+
+    def expire(self):
+        """Make the next refresh() reload, keeping the current contents until then."""
+        self.loaded_at = time.monotonic() - self.ttl - 1 if self.loaded_at is not None else None
+
+    def refresh(self, loader, force=False):
+        """
+        Reload from `loader()` (rows of rider_id, lat, lng, zone_id) if stale.
+
+        Only one thread reloads at a time; the others keep serving the current
+        contents, or wait for the first load. Returns True once the index has
+        been loaded.
+        """
+        if not force and not self.stale():
+            return True
+        if not self._reload_lock.acquire(blocking=self.loaded_at is None):
+            return True
+        try:
+            if not force and not self.stale():
+                return True
+            with self._lock:
+                self._loading = {}
+            try:
+                rows = loader()
+            except Exception:
+                with self._lock:
+                    self._loading = None
+                raise
+            self.replace(rows)
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def replace(self, rows):
+        riders = {}
+        cells = {}
+        for rider_id, lat, lng, zone_id in rows:
+            if lat is None or lng is None:
+                continue
+            cell = self._cell(lat, lng)
+            riders[rider_id] = (lat, lng, zone_id, cell)
+            cells.setdefault(cell, {})[rider_id] = (lat, lng, zone_id)
+        bounds = None
+        if cells:
+            rows, cols = zip(*cells)
+            bounds = (min(rows), max(rows), min(cols), max(cols))
+        with self._lock:
+            self._riders, self._cells, self._bounds = riders, cells, bounds
+            for rider_id, entry in (self._loading or {}).items():
+                self._apply(rider_id, entry)
+            self._loading = None
+            self.loaded_at = time.monotonic()
+
+    def upsert(self, rider_id, lat, lng, zone_id=None):
+        with self._lock:
+            self._write(rider_id, (lat, lng, zone_id))
+
+    def move(self, rider_id, lat, lng):
+        """Update the position of a rider already in the index; others are left out until they become available."""
+        with self._lock:
+            current = self._riders.get(rider_id)
+            if current is None:
+                return False
+            self._write(rider_id, (lat, lng, current[2]))
+            return True
+
+    def remove(self, rider_id):
+        with self._lock:
+            self._write(rider_id, None)
+
+    def _write(self, rider_id, entry):
+        if self._loading is not None:
+            self._loading[rider_id] = entry
+        self._apply(rider_id, entry)
+
+    def _apply(self, rider_id, entry):
+        old = self._riders.pop(rider_id, None)
+        if old is not None:
+            bucket = self._cells.get(old[3])
+            if bucket is not None:
+                bucket.pop(rider_id, None)
+                if not bucket:
+                    del self._cells[old[3]]
+        if entry is None or entry[0] is None or entry[1] is None:
+            return
+        lat, lng, zone_id = entry
+        cell = self._cell(lat, lng)
+        self._riders[rider_id] = (lat, lng, zone_id, cell)
+        self._cells.setdefault(cell, {})[rider_id] = (lat, lng, zone_id)
+        if self._bounds is None:
+            self._bounds = (cell[0], cell[0], cell[1], cell[1])
+        else:
+            min_row, max_row, min_col, max_col = self._bounds
+            self._bounds = (min(min_row, cell[0]), max(max_row, cell[0]), min(min_col, cell[1]), max(max_col, cell[1]))
+
+    def nearest(self, lat, lng, k, zone_id=None, max_distance=DISPATCH_MAX_DISTANCE):
+        """
+        The `k` closest riders within `max_distance` meters (None: any
+        distance) as [(rider_id, lat, lng, zone_id, meters)], closest first.
+
+        Rings of cells are searched outward while they are smaller than the
+        set of occupied cells; past that, so sparse or far-flung riders never
+        mean walking millions of empty cells, the occupied cells left are
+        visited nearest first. Either way the search stops once no unvisited
+        cell can hold a closer rider.
+        """
+        with self._lock:
+            if not self._cells or k <= 0:
+                return []
+            cells = self._cells
+            min_row, max_row, min_col, max_col = self._bounds
+            qrow, qcol = self._cell(lat, lng)
+            # Past this ring every occupied cell has been visited
+            last_ring = max(abs(qrow - min_row), abs(max_row - qrow), abs(qcol - min_col), abs(max_col - qcol))
+            best = []  # heap of (-meters, rider_id, lat, lng, zone_id)
+
+            def visit(bucket):
+                for rider_id, (rlat, rlng, rzone) in bucket.items():
+                    if zone_id is not None and rzone != zone_id:
+                        continue
+                    meters = distance_m(lat, lng, rlat, rlng)
+                    if max_distance is not None and meters > max_distance:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-meters, rider_id, rlat, rlng, rzone))
+                    elif meters < -best[0][0]:
+                        heapq.heapreplace(best, (-meters, rider_id, rlat, rlng, rzone))
+
+            def done(reach):
+                # Nothing left to visit is closer than `reach` meters
+                if max_distance is not None and reach > max_distance:
+                    return True
+                return len(best) == k and reach >= -best[0][0]
+
+            ring = 0
+            while ring <= last_ring and (2 * ring + 1) ** 2 <= len(cells):
+                for cell in _ring(qrow, qcol, ring):
+                    bucket = cells.get(cell)
+                    if bucket:
+                        visit(bucket)
+                # Anything outside rings 0..ring is at least `ring` cells away on one axis
+                if done(self._reach(lat, ring)):
+                    break
+                ring += 1
+            else:
+                # Rings have outgrown the occupied cells: rank those not visited yet by how close they can be
+                remaining = sorted(
+                    (self._cell_reach(lat, qrow, qcol, cell), cell) for cell in cells
+                    if max(abs(cell[0] - qrow), abs(cell[1] - qcol)) >= ring)
+                for reach, cell in remaining:
+                    if done(reach):
+                        break
+                    visit(cells[cell])
+        return [(rider_id, rlat, rlng, rzone, -neg) for neg, rider_id, rlat, rlng, rzone in sorted(best, reverse=True)]
+
+    def _cell_reach(self, lat, qrow, qcol, cell):
+        # Meters a rider in `cell` is at least away: its latitude gap, or its ring's reach
+        rows_between = max(0, abs(cell[0] - qrow) - 1)
+        ring = max(1, abs(cell[0] - qrow), abs(cell[1] - qcol)) - 1
+        return max(rows_between * self.cell * METERS_PER_DEGREE, self._reach(lat, ring))
+
+    def _reach(self, lat, ring):
+        # Meters covered by `ring` cells, using the narrower east-west span at the ring's far latitude
+        far_lat = min(90.0, abs(lat) + (ring + 1) * self.cell)
+        return ring * self.cell * METERS_PER_DEGREE * max(0.0, math.cos(math.radians(far_lat)))
+
+
+def _ring(row, col, ring):
+    if ring == 0:
+        yield row, col
+        return
+    for c in range(col - ring, col + ring + 1):
+        yield row - ring, c
+        yield row + ring, c
+    for r in range(row - ring + 1, row + ring):
+        yield r, col - ring
+        yield r, col + ring
+
+
+rider_index = RiderIndex(cell_degrees=DISPATCH_CELL_DEGREES, ttl=DISPATCH_INDEX_TTL)
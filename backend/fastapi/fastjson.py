@@ -0,0 +1,45 @@
+import json
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Return list endpoints as pre-serialized JSON, skipping FastAPI's jsonable_encoder pass
+FAST_JSON = os.getenv("FAST_JSON", "0") == "1"
+
+_deferred = ContextVar("fastjson_deferred", default=False)
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered by orjson (stdlib json without it), with no jsonable_encoder pass."""
+
+    media_type = "application/json"
+
+    def render(self, content):
+        if HAS_ORJSON:
+            return orjson.dumps(content)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=str).encode()
+
+
+def respond(content):
+    """Return `content` pre-serialized when FAST_JSON is on, otherwise as is for FastAPI to encode."""
+    if FAST_JSON and not _deferred.get():
+        return FastJSONResponse(content)
+    return content
+
+
+@contextmanager
+def deferred():
+    """Make respond() return plain content, for callers that embed handler results in a larger response."""
+    token = _deferred.set(True)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
@@ -0,0 +1,204 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import parse_qs
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse
+
+from uploads import is_content_name
+
+try:
+    import PIL  # noqa: F401  (only needed in the worker processes)
+    HAS_PILLOW = True
+except ImportError:
+    HAS_PILLOW = False
+
+# Standard widths generated for every uploaded image, as WebP
+VARIANT_WIDTHS = sorted(int(w) for w in os.getenv("IMAGE_VARIANT_WIDTHS", "160,320,640,1280").split(",") if w)
+WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+_executor = None
+# Originals with a variant job queued or running
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def enabled():
+    return HAS_PILLOW and bool(VARIANT_WIDTHS) and IMAGE_WORKERS > 0
+
+
+def variant_name(file_name, width=None):
+    """uuid.jpg -> uuid_w320.webp (or uuid.webp for the full-size re-encode)."""
+    stem = os.path.splitext(file_name)[0]
+    if width is None:
+        return f"{stem}.webp"
+    return f"{stem}_w{width}.webp"
+
+
+def variant_names(file_name):
+    names = {str(w): variant_name(file_name, w) for w in VARIANT_WIDTHS}
+    if not file_name.endswith(".webp"):
+        names["full"] = variant_name(file_name)
+    return names
+
+
+def variant_paths(file_name):
+    """
+    Size -> path (under /static) that serves that variant of `file_name`.
+    These go through VariantStaticFiles, so they serve the original until
+    the variant has been generated, or if it never can be.
+    """
+    paths = {str(w): f"{file_name}?w={w}" for w in VARIANT_WIDTHS}
+    if not file_name.endswith(".webp"):
+        paths["full"] = f"{file_name}?format=webp"
+    return paths
+
+
+def make_variants(upload_dir, file_name, widths, quality):
+    """
+    Resize `file_name` to each width and re-encode as WebP.
+    Runs in a worker process. Widths larger than the original are saved at
+    the original size so every advertised variant URL exists.
+    """
+    from PIL import Image
+
+    src = os.path.join(upload_dir, file_name)
+    written = []
+    with Image.open(src) as img:
+        img.load()
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        targets = [(w, variant_name(file_name, w)) for w in widths]
+        if not file_name.endswith(".webp"):
+            targets.append((None, variant_name(file_name)))
+        for width, name in targets:
+            out = img
+            if width is not None and img.width > width:
+                height = max(1, round(img.height * width / img.width))
+                out = img.resize((width, height), Image.LANCZOS)
+            tmp_path = os.path.join(upload_dir, f".{name}.tmp")
+            out.save(tmp_path, "WEBP", quality=quality, method=4)
+            os.replace(tmp_path, os.path.join(upload_dir, name))
+            written.append(name)
+    return written
+
+
+def _finished(file_name, future):
+    with _pending_lock:
+        _pending.discard(file_name)
+    error = future.exception()
+    if error:
+        print(f"Error generating image variants: {error}")
+
+
+def schedule_variants(upload_dir, file_name):
+    """
+    Queue derivative generation without waiting for it; returns the variant
+    paths (variant_paths), or {} when no variants are generated.
+    Nothing is queued when every variant file already exists (duplicate
+    upload) or a job for the file is already running; a duplicate upload
+    of an image whose variants are missing, e.g. because an earlier job
+    failed, queues them again. Checks the disk, so call it off the event loop.
+    If the worker pool has died (e.g. a worker was OOM-killed), it is dropped
+    so the next upload starts a new one, and this upload gets no variants.
+    """
+    global _executor
+    if not enabled():
+        return {}
+    names = variant_names(file_name).values()
+    if all(os.path.isfile(os.path.join(upload_dir, name)) for name in names):
+        return variant_paths(file_name)
+    with _pending_lock:
+        if file_name in _pending:
+            return variant_paths(file_name)
+        _pending.add(file_name)
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        executor = _executor
+    try:
+        future = executor.submit(make_variants, upload_dir, file_name, VARIANT_WIDTHS, WEBP_QUALITY)
+    except (BrokenProcessPool, RuntimeError) as e:
+        print(f"Error queueing image variants: {e!r}")
+        with _pending_lock:
+            _pending.discard(file_name)
+            if _executor is executor:
+                _executor = None
+        executor.shutdown(wait=False)
+        return {}
+    future.add_done_callback(lambda done: _finished(file_name, done))
+    return variant_paths(file_name)
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+    with _pending_lock:
+        _pending.clear()
+
+
+class VariantStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves the best generated variant of an image.
+
+    /static/<name>?w=300 serves the smallest variant at least 300px wide, and
+    /static/<name>?format=webp, or a plain request from a client that accepts
+    WebP, gets the full-size WebP.
+    Falls back to the original while variants are still being generated.
+
+    Content-addressed files never change, so they are served with a strong
+    ETag (their file name) and a one-year immutable Cache-Control.
+    """
+
+    async def get_response(self, path, scope):
+        candidate = self._pick_variant(path, scope)
+        if candidate and await run_in_threadpool(os.path.isfile, os.path.join(self.directory, candidate)):
+            response = await super().get_response(candidate, scope)
+        else:
+            response = await super().get_response(path, scope)
+            if candidate:
+                # Variant not generated yet: don't let caches pin the fallback
+                response.headers["Cache-Control"] = "no-cache"
+        response.headers["Vary"] = "Accept"
+        return response
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        name = os.path.basename(full_path)
+        headers = {}
+        if is_content_name(name):
+            headers["etag"] = f'"{name}"'
+            headers["cache-control"] = "public, max-age=31536000, immutable"
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    @staticmethod
+    def _pick_variant(path, scope):
+        base = os.path.basename(path)
+        if base.startswith(".") or (base.endswith(".webp") and "_w" in base):
+            return None
+        headers = dict(scope.get("headers") or [])
+        accepts_webp = b"image/webp" in headers.get(b"accept", b"")
+        query = parse_qs(scope.get("query_string", b"").decode())
+        width = None
+        if "w" in query:
+            try:
+                width = int(query["w"][0])
+            except ValueError:
+                width = None
+        if width is not None and VARIANT_WIDTHS:
+            # WebP variants are served even without an Accept hint when a width is asked for
+            fits = [w for w in VARIANT_WIDTHS if w >= width]
+            chosen = fits[0] if fits else VARIANT_WIDTHS[-1]
+            return os.path.join(os.path.dirname(path), variant_name(base, chosen))
+        if (accepts_webp or query.get("format") == ["webp"]) and not base.endswith(".webp"):
+            return os.path.join(os.path.dirname(path), variant_name(base))
+        return None
@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+
+# Seconds between flushes of buffered rider positions to riders_data
+LOCATION_FLUSH_INTERVAL = float(os.getenv("LOCATION_FLUSH_INTERVAL", "1.0"))
+# Riders with an unflushed position before new riders' pings are refused
+LOCATION_MAX_PENDING = int(os.getenv("LOCATION_MAX_PENDING", "100000"))
+# Most pings accepted in one updateRiderLocations call
+MAX_LOCATION_PINGS = int(os.getenv("MAX_LOCATION_PINGS", "1000"))
+# Seconds a written position's time is remembered to drop late, out-of-order pings
+LOCATION_ORDER_WINDOW = float(os.getenv("LOCATION_ORDER_WINDOW", "60"))
+
+
+class BufferFull(Exception):
+    """Raised when a ping for a new rider arrives while LOCATION_MAX_PENDING positions wait to be flushed."""
+
+
+class LocationBuffer:
+    """
+    Coalescing write-behind buffer for rider location pings.
+
+    add() keeps only the newest position per rider (by recorded time; late,
+    out-of-order pings are dropped, for up to `order_window` seconds after
+    the newer position was written). A background thread started on the
+    first ping hands everything buffered to `writer(batch)` every `interval`
+    seconds, where batch is {rider_id: (lat, lng, recorded_at)}, so each
+    rider costs at most one row write per interval however often it pings.
+    A failed flush is merged back and retried on the next one.
+
+    latest() serves the positions this worker has not written yet, which are
+    newer than the table; once written, the table (shared by every worker)
+    is the source of truth and they are forgotten.
+    """
+
+    def __init__(self, writer, interval=1.0, max_pending=100000, order_window=60.0):
+        self.writer = writer
+        self.interval = interval
+        self.max_pending = max_pending
+        self.order_window = order_window
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = {}  # rider_id -> (lat, lng, recorded_at)
+        self._latest = {}  # the same, plus positions being written
+        self._written = {}  # rider_id -> (recorded_at, monotonic time written)
+        self._thread = None
+        self._stopped = False
+
+        self.received = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flushed = 0
+        self.errors = 0
+
+    def add(self, rider_id, lat, lng, recorded_at=None):
+        """Buffer one ping; returns False if a newer position is already known."""
+        position = (lat, lng, time.time() if recorded_at is None else recorded_at)
+        with self._lock:
+            self.received += 1
+            latest = self._latest.get(rider_id)
+            newest = latest[2] if latest is not None else self._written.get(rider_id, (None,))[0]
+            if newest is not None and newest > position[2]:
+                self.dropped += 1
+                return False
+            if rider_id not in self._pending and len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                raise BufferFull(f"{len(self._pending)} rider positions waiting to be written")
+            self._pending[rider_id] = position
+            self._latest[rider_id] = position
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._run, name="location-flush", daemon=True)
+                self._thread.start()
+        return True
+
+    def latest(self, rider_ids=None):
+        """{rider_id: (lat, lng, recorded_at)} not written yet, for `rider_ids` (every rider when None)."""
+        with self._lock:
+            if rider_ids is None:
+                return dict(self._latest)
+            return {r: self._latest[r] for r in rider_ids if r in self._latest}
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Write everything buffered now; returns the number of riders written."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        try:
+            self.writer(batch)
+        except Exception as e:
+            print(f"Error flushing {len(batch)} rider locations: {e}")
+            with self._lock:
+                self.errors += 1
+                for rider_id, position in batch.items():
+                    # Keep a newer ping that arrived during the failed write
+                    self._pending.setdefault(rider_id, position)
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            self.flushes += 1
+            self.flushed += len(batch)
+            for rider_id, position in batch.items():
+                if self._latest.get(rider_id) is position:
+                    del self._latest[rider_id]
+                self._written[rider_id] = (position[2], now)
+            expired = [r for r, (_, written) in self._written.items() if now - written > self.order_window]
+            for rider_id in expired:
+                del self._written[rider_id]
+        return len(batch)
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the flush thread after one last flush."""
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "received": self.received,
+                "dropped": self.dropped,
+                "pending": len(self._pending),
+                "flushes": self.flushes,
+                "flushed": self.flushed,
+                "errors": self.errors,
+            }
+
+
+def write_locations(cur, batch):
+    """Set riders_data.current_location for every rider in `batch` with one statement."""
+    rider_ids = sorted(batch)  # same row lock order in every worker
+    cur.execute("""
+        UPDATE riders_data rd
+        SET current_location = ST_SetSRID(ST_MakePoint(v.lng, v.lat), 4326)::geography,
+            updated_at = NOW()
+        FROM unnest(%s::uuid[], %s::float8[], %s::float8[]) AS v(user_id, lat, lng)
+        WHERE rd.user_id = v.user_id
+    """, (rider_ids, [batch[r][0] for r in rider_ids], [batch[r][1] for r in rider_ids]))
+    return cur.rowcount
@@ -0,0 +1,296 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+import sql_trace
+from prepared import PreparingCursor
+
+# Histogram bucket upper bounds (seconds / rows)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+_current = ContextVar("request_stats", default=None)
+_lock = threading.Lock()
+
+
+class RequestStats:
+    """Per-request accumulator filled in by MetricsCursor and the pool wait hook."""
+
+    __slots__ = ("scope", "db_seconds", "queries", "rows", "pool_wait", "trace")
+
+    def __init__(self, scope=None, trace=False):
+        self.scope = scope
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.pool_wait = 0.0
+        self.trace = [] if trace else None  # [(query, seconds, rows), ...]
+
+    @property
+    def action(self):
+        route = self.scope.get("route") if self.scope is not None else None
+        return route.path.lstrip("/") if route is not None else "unmatched"
+
+
+def current_stats():
+    return _current.get()
+
+
+class Histogram:
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series = {}  # label value -> [bucket counts..., +Inf count], sum
+
+    def observe(self, label, value):
+        series = self._series.get(label)
+        if series is None:
+            series = self._series[label] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self, lines, label_name):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} histogram")
+        for label, (counts, total) in sorted(self._series.items()):
+            label = _escape(label)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_name}="{label}",le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{label_name}="{label}",le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_name}="{label}"}} {total}')
+            lines.append(f'{self.name}_count{{{label_name}="{label}"}} {cumulative}')
+
+
+class Counter:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = {}  # tuple of (label, value) pairs -> count
+
+    def inc(self, labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} counter")
+        for labels, value in sorted(self._values.items()):
+            text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+            lines.append(f"{self.name}{{{text}}} {value}")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_seconds = Histogram(
+    "action_request_duration_seconds", "Time from request start to response end, per action.", LATENCY_BUCKETS)
+db_seconds = Histogram(
+    "action_db_duration_seconds", "Time spent executing SQL per request, per action.", LATENCY_BUCKETS)
+pool_wait_seconds = Histogram(
+    "action_pool_wait_seconds", "Time spent checking out pool connections per request, per action.", WAIT_BUCKETS)
+db_rows = Histogram(
+    "action_db_rows", "Rows returned or affected by SQL per request, per action.", ROW_BUCKETS)
+db_queries = Counter("action_db_queries_total", "SQL statements executed, per action.")
+errors = Counter("action_errors_total", "Responses with status >= 400, per action and status.")
+
+
+def record(action, status, elapsed, stats):
+    with _lock:
+        request_seconds.observe(action, elapsed)
+        db_seconds.observe(action, stats.db_seconds)
+        pool_wait_seconds.observe(action, stats.pool_wait)
+        db_rows.observe(action, stats.rows)
+        if stats.queries:
+            db_queries.inc((("action", action),), stats.queries)
+        if status >= 400:
+            errors.inc((("action", action), ("status", str(status))))
+
+
+def record_pool_wait(seconds):
+    """ConnectionPool on_wait hook."""
+    stats = _current.get()
+    if stats is not None:
+        stats.pool_wait += seconds
+
+
+class MetricsCursor(PreparingCursor):
+    """
+    Cursor used by every pooled connection. Each statement is timed and
+    added to the current request's stats (and trace, when requested);
+    statements over SLOW_QUERY_MS go to the slow-query log with their
+    bind parameters redacted.
+    """
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _account(self, query, vars, start)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _account(self, query, None, start)
+
+    def copy_expert(self, sql, file, size=8192):
+        start = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            _account(self, sql, None, start)
+
+
+def _account(cur, query, params, start):
+    elapsed = time.perf_counter() - start
+    rows = cur.rowcount
+    stats = _current.get()
+    if stats is not None:
+        stats.db_seconds += elapsed
+        stats.queries += 1
+        if rows > 0:
+            stats.rows += rows
+        if stats.trace is not None:
+            stats.trace.append((query, elapsed, rows))
+    if sql_trace.SLOW_QUERY_MS and elapsed * 1000 >= sql_trace.SLOW_QUERY_MS:
+        sql_trace.log_slow(stats.action if stats is not None else None, query, params, elapsed, rows)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that sets up per-request stats for MetricsCursor, then
+    records the request under its route path (e.g. "restaurantsPaginated").
+    Requests that match no route are grouped as "unmatched" to keep label
+    cardinality bounded.
+
+    With SQL_TRACE_ENABLED, a request sent with X-SQL-Trace: 1 gets its
+    statement summary back in the X-SQL-Trace response header.
+    """
+
+    def __init__(self, app, record_metrics=True):
+        self.app = app
+        self.record_metrics = record_metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = sql_trace.SQL_TRACE_ENABLED and _wants_trace(scope)
+        stats = RequestStats(scope, trace)
+        token = _current.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if trace:
+                    header = sql_trace.trace_header(stats.trace).encode()
+                    message["headers"] = list(message.get("headers", [])) + [(sql_trace.TRACE_HEADER.encode(), header)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            if self.record_metrics:
+                record(stats.action, status, elapsed, stats)
+
+
+def _wants_trace(scope):
+    for name, value in scope.get("headers", ()):
+        if name == b"x-sql-trace":
+            return value.strip() in (b"1", b"true")
+    return False
+
+
+def render(pool_stats=None, location_stats=None, order_stats=None, rollup_stats=None, event_stats=None):
+    """Metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        request_seconds.render(lines, "action")
+        db_seconds.render(lines, "action")
+        pool_wait_seconds.render(lines, "action")
+        db_rows.render(lines, "action")
+        db_queries.render(lines)
+        errors.render(lines)
+    if pool_stats:
+        gauges = [
+            ("db_pool_connections", "gauge", "Open pool connections.", pool_stats["size"]),
+            ("db_pool_connections_idle", "gauge", "Idle pool connections.", pool_stats["idle"]),
+            ("db_pool_connections_max", "gauge", "Pool size limit.", pool_stats["maxSize"]),
+            ("db_pool_waiting", "gauge", "Callers waiting for a connection.", pool_stats["waiting"]),
+            ("db_pool_checkouts_total", "counter", "Successful connection checkouts.", pool_stats["checkouts"]),
+            ("db_pool_timeouts_total", "counter", "Checkouts that timed out.", pool_stats["timeouts"]),
+            ("db_pool_rejected_total", "counter", "Checkouts rejected because the wait queue was full.",
+             pool_stats["rejected"]),
+            ("db_pool_reconnects_total", "counter", "Broken connections replaced on checkout.",
+             pool_stats["reconnects"]),
+        ]
+        _render_values(lines, gauges)
+    if location_stats:
+        _render_values(lines, [
+            ("rider_location_pings_total", "counter", "Rider location pings received.", location_stats["received"]),
+            ("rider_location_pings_dropped_total", "counter", "Pings dropped as out of order or refused.",
+             location_stats["dropped"]),
+            ("rider_location_pending", "gauge", "Riders with a position not yet written.", location_stats["pending"]),
+            ("rider_location_flushes_total", "counter", "Successful location flushes.", location_stats["flushes"]),
+            ("rider_location_rows_written_total", "counter", "Rider positions written by flushes.",
+             location_stats["flushed"]),
+            ("rider_location_flush_errors_total", "counter", "Failed location flushes.", location_stats["errors"]),
+        ])
+    if order_stats and order_stats["submitted"]:
+        _render_values(lines, [
+            ("order_queue_submitted_total", "counter", "Orders queued for group commit.", order_stats["submitted"]),
+            ("order_queue_rejected_total", "counter", "Orders refused because the queue was full.",
+             order_stats["rejected"]),
+            ("order_queue_pending", "gauge", "Orders waiting to be written.", order_stats["pending"]),
+            ("order_queue_batches_total", "counter", "Committed order batches.", order_stats["batches"]),
+            ("order_queue_placed_total", "counter", "Orders committed by the queue.", order_stats["placed"]),
+            ("order_queue_failed_total", "counter", "Queued orders that failed.", order_stats["failed"]),
+            ("order_queue_largest_batch", "gauge", "Most orders committed by one batch so far.",
+             order_stats["largestBatch"]),
+        ])
+    if rollup_stats:
+        _render_values(lines, [
+            ("order_rollup_refreshes_total", "counter", "Order rollup refreshes run by this worker.",
+             rollup_stats["runs"]),
+            ("order_rollup_refreshes_skipped_total", "counter", "Refreshes skipped while another worker refreshed.",
+             rollup_stats["skipped"]),
+            ("order_rollup_orders_applied_total", "counter", "Changed orders read by refreshes.",
+             rollup_stats["applied"]),
+            ("order_rollup_refresh_errors_total", "counter", "Failed order rollup refreshes.", rollup_stats["errors"]),
+            ("order_rollup_last_refresh_timestamp_seconds", "gauge", "Unix time of the last refresh by this worker.",
+             rollup_stats["lastRun"] or 0),
+        ])
+    if event_stats:
+        _render_values(lines, [
+            ("order_event_subscribers", "gauge", "Open orderEvents streams in this worker.", event_stats["subscribers"]),
+            ("order_event_listening", "gauge", "1 while the worker's LISTEN connection is open.",
+             int(event_stats["listening"])),
+            ("order_event_notifications_total", "counter", "Order notifications received.", event_stats["received"]),
+            ("order_event_deliveries_total", "counter", "Order events queued to streams.", event_stats["delivered"]),
+            ("order_event_dropped_total", "counter", "Streams closed for falling behind.", event_stats["dropped"]),
+            ("order_event_reconnects_total", "counter", "Times the LISTEN connection was lost.",
+             event_stats["reconnects"]),
+        ])
+    lines.append("")
+    return "\n".join(lines)
+
+
+def _render_values(lines, values):
+    for name, kind, help, value in values:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {value}")
@@ -0,0 +1,309 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from collections import deque
+
+import psycopg2
+
+# Channel the order_events.sql triggers notify on
+ORDER_EVENTS_CHANNEL = "order_events"
+# Open orderEvents streams per worker before new ones are refused
+ORDER_EVENTS_MAX_SUBSCRIBERS = int(os.getenv("ORDER_EVENTS_MAX_SUBSCRIBERS", "20000"))
+# Events buffered for one subscriber before it is dropped as too slow
+ORDER_EVENTS_BUFFER = int(os.getenv("ORDER_EVENTS_BUFFER", "100"))
+# Seconds between keep-alives on idle streams
+ORDER_EVENTS_HEARTBEAT = float(os.getenv("ORDER_EVENTS_HEARTBEAT", "15"))
+# Seconds between attempts to re-open a lost listener connection
+ORDER_EVENTS_RECONNECT_DELAY = float(os.getenv("ORDER_EVENTS_RECONNECT_DELAY", "1.0"))
+# Key signing orderEventsToken tokens; must be the same on every worker (random per process if unset)
+ORDER_EVENTS_SECRET = os.getenv("ORDER_EVENTS_SECRET") or secrets.token_hex(32)
+# Seconds an orderEventsToken token can be used to open a stream
+ORDER_EVENTS_TOKEN_TTL = int(os.getenv("ORDER_EVENTS_TOKEN_TTL", "3600"))
+
+# Subscription filters -> event fields they match
+FILTERS = {
+    "restaurant": ("restaurantId",),
+    "rider": ("riderId", "previousRiderId"),
+    "customer": ("userId",),
+}
+
+
+class TooManySubscribers(Exception):
+    """Raised when ORDER_EVENTS_MAX_SUBSCRIBERS streams are already open in this worker."""
+
+
+class InvalidToken(ValueError):
+    """Raised for a stream token that is malformed, forged or expired."""
+
+
+def _signature(payload, secret):
+    return hmac.new(secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+
+def sign_subscription(kind, value, ttl=ORDER_EVENTS_TOKEN_TTL, secret=ORDER_EVENTS_SECRET):
+    """Token letting its holder open `kind` streams of `value` for the next `ttl` seconds."""
+    payload = f"{kind}.{value}.{int(time.time()) + ttl}"
+    return f"{payload}.{_signature(payload, secret)}"
+
+
+def verify_subscription(token, secret=ORDER_EVENTS_SECRET):
+    """(kind, value) of a token from sign_subscription, raising InvalidToken."""
+    payload, _, signature = str(token or "").rpartition(".")
+    if not hmac.compare_digest(signature.encode(), _signature(payload, secret).encode()):
+        raise InvalidToken("invalid token")
+    kind, value, expires = payload.split(".")
+    if kind not in FILTERS:
+        raise InvalidToken("invalid token")
+    if int(expires) < time.time():
+        raise InvalidToken("token has expired")
+    return kind, value
+
+
+class OrderEvent:
+    """One event as sent to every subscriber it matches; each wire format is built once."""
+
+    __slots__ = ("name", "data", "_sse", "_text")
+
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data  # JSON text
+        self._sse = None
+        self._text = None
+
+    def sse(self):
+        if self._sse is None:
+            self._sse = f"event: {self.name}\ndata: {self.data}\n\n".encode()
+        return self._sse
+
+    def text(self):
+        if self._text is None:
+            self._text = f'{{"event": "{self.name}", "data": {self.data}}}'
+        return self._text
+
+
+HEARTBEAT = OrderEvent("heartbeat", "{}")
+# Sent after the listener reconnects: events in between were missed
+RESYNC = OrderEvent("resync", "{}")
+
+
+class Subscription:
+    """
+    Events for one stream. The hub appends without waiting; a subscriber
+    more than `buffer` events behind is closed, and its client reconnects
+    and refetches.
+    """
+
+    __slots__ = ("key", "buffer", "_events", "_ready", "closed")
+
+    def __init__(self, key, buffer):
+        self.key = key
+        self.buffer = buffer
+        self._events = deque()
+        self._ready = asyncio.Event()
+        self.closed = False
+
+    def push(self, event):
+        if self.closed:
+            return False
+        if len(self._events) >= self.buffer:
+            self.close()
+            return False
+        self._events.append(event)
+        self._ready.set()
+        return True
+
+    def idle(self):
+        return not self._events
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._events:
+            if self.closed:
+                raise StopAsyncIteration
+            self._ready.clear()
+            await self._ready.wait()
+        return self._events.popleft()
+
+
+class OrderEventHub:
+    """
+    One LISTEN connection per worker, fanned out to in-process subscribers.
+
+    The connection is opened on the first subscribe() and read by the event
+    loop itself (add_reader), so there is no thread and no query per
+    subscriber. Subscribers are indexed by filter, so an event only touches
+    the subscribers of its restaurant, riders and customer. A lost
+    connection is re-opened every `reconnect_delay` seconds, after which
+    every subscriber gets a resync event.
+    """
+
+    def __init__(self, dsn, max_subscribers=20000, buffer=100, heartbeat=15.0, reconnect_delay=1.0):
+        self.dsn = dsn
+        self.max_subscribers = max_subscribers
+        self.buffer = buffer
+        self.heartbeat = heartbeat
+        self.reconnect_delay = reconnect_delay
+        self._subscribers = {}  # (filter, id) -> set of Subscription
+        self._count = 0
+        self._loop = None
+        self._conn = None
+        self._tasks = []
+
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self.errors = 0
+
+    def subscribe(self, kind, value):
+        """A Subscription to the orders of restaurant/rider/customer `value`; call from the event loop."""
+        if kind not in FILTERS:
+            raise ValueError(f"kind must be one of {', '.join(FILTERS)}")
+        if self._count >= self.max_subscribers:
+            raise TooManySubscribers(f"{self._count} order event streams open")
+        self._start()
+        subscription = Subscription((kind, value), self.buffer)
+        self._subscribers.setdefault(subscription.key, set()).add(subscription)
+        self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscribers = self._subscribers.get(subscription.key)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.key]
+        self._count -= 1
+        subscription.close()
+
+    def publish(self, payload):
+        """Deliver one notification payload (JSON text) to the subscribers it matches."""
+        self.received += 1
+        try:
+            order = json.loads(payload)
+        except ValueError:
+            self.errors += 1
+            return 0
+        event = OrderEvent("order", payload)
+        matched = set()
+        for kind, fields in FILTERS.items():
+            for field in fields:
+                value = order.get(field)
+                if value is not None:
+                    matched.update(self._subscribers.get((kind, value), ()))
+        delivered = 0
+        for subscription in matched:
+            if subscription.push(event):
+                delivered += 1
+            else:
+                self.dropped += 1
+                self.unsubscribe(subscription)
+        self.delivered += delivered
+        return delivered
+
+    def _broadcast(self, event):
+        for subscribers in list(self._subscribers.values()):
+            for subscription in list(subscribers):
+                if (event is not HEARTBEAT or subscription.idle()) and not subscription.push(event):
+                    self.dropped += 1
+                    self.unsubscribe(subscription)
+
+    def _start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        if self._loop is not None:
+            self.close()  # left over from a loop that has ended
+        self._loop = loop
+        self._tasks = [loop.create_task(self._connect(resync=False)), loop.create_task(self._heartbeats())]
+
+    def _open(self):
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {ORDER_EVENTS_CHANNEL}")
+        return conn
+
+    async def _connect(self, resync):
+        while self._loop is not None:
+            try:
+                conn = await self._loop.run_in_executor(None, self._open)
+            except Exception as e:
+                print(f"Error listening for order events: {e}")
+                self.errors += 1
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            if self._loop is None:
+                conn.close()
+                return
+            self._conn = conn
+            self._loop.add_reader(conn.fileno(), self._read)
+            if resync:
+                self._broadcast(RESYNC)
+            return
+
+    def _read(self):
+        conn = self._conn
+        try:
+            conn.poll()
+        except psycopg2.Error as e:
+            print(f"Order event listener lost: {e}")
+            self._lost()
+            return
+        notifies = conn.notifies[:]
+        del conn.notifies[:]
+        for notify in notifies:
+            self.publish(notify.payload)
+
+    def _lost(self):
+        self._loop.remove_reader(self._conn.fileno())
+        self._conn.close()
+        self._conn = None
+        self.reconnects += 1
+        self._tasks.append(self._loop.create_task(self._connect(resync=True)))
+
+    async def _heartbeats(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            self._broadcast(HEARTBEAT)
+
+    def close(self):
+        """Stop listening and end every open stream; call from the event loop."""
+        loop, self._loop = self._loop, None
+        alive = loop is not None and not loop.is_closed()
+        if alive:
+            for task in self._tasks:
+                task.cancel()
+        self._tasks = []
+        if self._conn is not None:
+            if alive:
+                loop.remove_reader(self._conn.fileno())
+            self._conn.close()
+            self._conn = None
+        subscribers, self._subscribers, self._count = self._subscribers, {}, 0
+        if alive:
+            for group in subscribers.values():
+                for subscription in group:
+                    subscription.close()
+
+    def stats(self):
+        return {
+            "subscribers": self._count,
+            "listening": self._conn is not None,
+            "received": self.received,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+            "errors": self.errors,
+        }
@@ -0,0 +1,411 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future
+from decimal import Decimal, InvalidOperation
+
+# Most items accepted in one order
+MAX_ORDER_ITEMS = int(os.getenv("MAX_ORDER_ITEMS", "200"))
+# Most addons accepted on one order item
+MAX_ITEM_ADDONS = int(os.getenv("MAX_ITEM_ADDONS", "50"))
+
+# Queue placeOrder calls and commit them in groups on a writer thread (peak-hour mode)
+ORDER_QUEUE_ENABLED = os.getenv("ORDER_QUEUE_ENABLED", "false").lower() == "true"
+# Orders waiting to be written before placeOrder answers 503
+ORDER_QUEUE_MAX_PENDING = int(os.getenv("ORDER_QUEUE_MAX_PENDING", "2000"))
+# Most orders committed by one transaction
+ORDER_QUEUE_MAX_BATCH = int(os.getenv("ORDER_QUEUE_MAX_BATCH", "100"))
+# Seconds a writer waits for more orders before committing a partial batch (0: commit what is queued)
+ORDER_QUEUE_LINGER = float(os.getenv("ORDER_QUEUE_LINGER", "0"))
+# Writer threads, each committing its own batches on its own connection
+ORDER_QUEUE_WRITERS = int(os.getenv("ORDER_QUEUE_WRITERS", "1"))
+
+PAYMENT_METHODS = {"CASH", "CARD", "WALLET"}
+
+ORDER_COLUMNS = """
+    o.id, o.order_id, o.user_id, o.restaurant_id, o.status, o.order_amount, o.delivery_charges,
+    o.tax_amount, o.total_amount, o.payment_method, o.payment_status, o.order_date
+"""
+
+
+class OrderError(ValueError):
+    """Raised for order input that cannot be placed as given."""
+
+
+class IdempotencyConflict(Exception):
+    """Raised when an idempotency key is reused for a different order."""
+
+
+class QueueFull(Exception):
+    """Raised when ORDER_QUEUE_MAX_PENDING orders are already waiting to be written."""
+
+
+def _uuid(value, field, required=True):
+    if value in (None, ""):
+        if required:
+            raise OrderError(f"{field} is required")
+        return None
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        raise OrderError(f"{field} must be an id")
+
+
+def _money(value, field, default=None):
+    if value in (None, ""):
+        if default is None:
+            raise OrderError(f"{field} is required")
+        return default
+    try:
+        amount = Decimal(str(value))
+    except InvalidOperation:
+        raise OrderError(f"{field} must be a number")
+    if not amount.is_finite() or amount < 0:
+        raise OrderError(f"{field} must be a non-negative number")
+    return str(amount)
+
+
+def _get(raw, camel, snake):
+    # Items may use the camelCase action fields or place_manual_order's snake_case keys
+    return raw.get(camel, raw.get(snake))
+
+
+def validate_order(raw, default_user=None):
+    """
+    Normalize a placeOrder order into plain JSON values, raising OrderError.
+
+    Money stays as decimal strings so the request hash and the stored values
+    are exact.
+    """
+    if not isinstance(raw, dict):
+        raise OrderError("order must be an object")
+    items = raw.get("items")
+    if not isinstance(items, list) or not items:
+        raise OrderError("order needs at least one item")
+    if len(items) > MAX_ORDER_ITEMS:
+        raise OrderError(f"At most {MAX_ORDER_ITEMS} items per order")
+    payment_method = str(raw.get("paymentMethod") or "CASH").upper()
+    if payment_method not in PAYMENT_METHODS:
+        raise OrderError(f"Invalid paymentMethod: {raw.get('paymentMethod')}")
+    address = raw.get("deliveryAddress")
+    if not isinstance(address, dict):
+        raise OrderError("deliveryAddress must be an object")
+
+    order = {
+        "userId": _uuid(raw.get("userId") or default_user, "userId"),
+        "restaurantId": _uuid(raw.get("restaurantId"), "restaurantId"),
+        "deliveryAddress": address,
+        "paymentMethod": payment_method,
+        "orderAmount": _money(raw.get("orderAmount"), "orderAmount"),
+        "deliveryCharges": _money(raw.get("deliveryCharges"), "deliveryCharges", "0"),
+        "taxAmount": _money(raw.get("taxAmount"), "taxAmount", "0"),
+        "totalAmount": _money(raw.get("totalAmount"), "totalAmount"),
+        "specialInstructions": raw.get("specialInstructions"),
+        "items": [],
+    }
+    for n, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise OrderError(f"items[{n}] must be an object")
+        title = item.get("title")
+        if not title:
+            raise OrderError(f"items[{n}].title is required")
+        try:
+            quantity = int(item.get("quantity", 1))
+        except (TypeError, ValueError):
+            raise OrderError(f"items[{n}].quantity must be a whole number")
+        if quantity < 1:
+            raise OrderError(f"items[{n}].quantity must be at least 1")
+        addons = item.get("addons") or []
+        if not isinstance(addons, list) or len(addons) > MAX_ITEM_ADDONS:
+            raise OrderError(f"items[{n}].addons must be a list of at most {MAX_ITEM_ADDONS}")
+        normalized = {
+            "food_id": _uuid(_get(item, "foodId", "food_id"), f"items[{n}].foodId", required=False),
+            "title": str(title),
+            "quantity": quantity,
+            "unit_price": _money(_get(item, "unitPrice", "unit_price"), f"items[{n}].unitPrice"),
+            "total_price": _money(_get(item, "totalPrice", "total_price"), f"items[{n}].totalPrice"),
+            "special_instructions": _get(item, "specialInstructions", "special_instructions"),
+            "addons": [],
+        }
+        for m, addon in enumerate(addons):
+            if not isinstance(addon, dict) or not addon.get("title"):
+                raise OrderError(f"items[{n}].addons[{m}].title is required")
+            normalized["addons"].append({
+                "addon_id": _uuid(_get(addon, "addonId", "addon_id"), f"items[{n}].addons[{m}].addonId",
+                                  required=False),
+                "title": str(addon["title"]),
+                "price": _money(addon.get("price"), f"items[{n}].addons[{m}].price", "0"),
+            })
+        order["items"].append(normalized)
+    return order
+
+
+def request_hash(order):
+    """Fingerprint of a validated order, to tell a retry from a different order under the same key."""
+    body = json.dumps(order, sort_keys=True, separators=(",", ":"), default=str).encode()
+    return hashlib.sha256(body).hexdigest()
+
+
+# Places every order of a batch: claims their idempotency keys, then inserts
+# the orders whose key is new (or that have none) with all their items, addons
+# and first status rows. Order ids come from the caller so key rows can point
+# at them; foreign keys are checked at the end of the statement, after the
+# orders exist. Item ids are made in `lines` so addons can point at them.
+PLACE_ORDERS_SQL = """
+    WITH input AS (
+        SELECT * FROM jsonb_to_recordset(%s::jsonb) AS x(
+            id uuid, idempotency_key text, request_hash text, user_id uuid, restaurant_id uuid,
+            delivery_address jsonb, order_amount numeric, delivery_charges numeric, tax_amount numeric,
+            total_amount numeric, payment_method text, special_instructions text, items jsonb
+        )
+    ),
+    claim AS (
+        INSERT INTO order_requests (user_id, idempotency_key, request_hash, order_id)
+        SELECT user_id, idempotency_key, request_hash, id FROM input WHERE idempotency_key IS NOT NULL
+        ON CONFLICT (user_id, idempotency_key) DO NOTHING
+        RETURNING order_id
+    ),
+    o AS (
+        INSERT INTO orders (
+            id, order_id, user_id, restaurant_id, status, delivery_address,
+            order_amount, delivery_charges, tax_amount, total_amount,
+            payment_method, payment_status, special_instructions, order_date
+        )
+        SELECT
+            x.id, 'ORD-' || to_char(NOW(), 'YYYYMMDD') || '-' || LPAD(x.n::text, GREATEST(length(x.n::text), 4), '0'),
+            x.user_id, x.restaurant_id, 'PENDING', x.delivery_address,
+            x.order_amount, x.delivery_charges, x.tax_amount, x.total_amount,
+            x.payment_method, 'PENDING', x.special_instructions, NOW()
+        FROM (
+            SELECT input.*, nextval('order_id_seq') AS n
+            FROM input
+            WHERE idempotency_key IS NULL OR id IN (SELECT order_id FROM claim)
+        ) x
+        RETURNING *
+    ),
+    lines AS (
+        SELECT uuid_generate_v4() AS id, o.id AS order_id, i.*
+        FROM o JOIN input x ON x.id = o.id, jsonb_to_recordset(x.items) AS i(
+            food_id uuid, title text, quantity integer, unit_price numeric,
+            total_price numeric, special_instructions text, addons jsonb
+        )
+    ),
+    items AS (
+        INSERT INTO order_items (id, order_id, food_id, title, quantity, unit_price, total_price, special_instructions)
+        SELECT l.id, l.order_id, l.food_id, l.title, l.quantity, l.unit_price, l.total_price, l.special_instructions
+        FROM lines l
+    ),
+    addons AS (
+        INSERT INTO order_addons (order_item_id, addon_id, title, price)
+        SELECT l.id, a.addon_id, a.title, a.price
+        FROM lines l, jsonb_to_recordset(l.addons) AS a(addon_id uuid, title text, price numeric)
+    ),
+    history AS (
+        INSERT INTO order_status_history (order_id, status, notes)
+        SELECT o.id, 'PENDING', %s FROM o
+    )
+    SELECT """ + ORDER_COLUMNS + """ FROM o
+"""
+
+
+def place_orders(cur, orders, notes="Order placed via placeOrder"):
+    """
+    Place validated orders given as (order, idempotency_key) pairs with one
+    statement, plus one lookup if some keys were already used. Returns, in
+    the same order, (row, replayed) for each, or an IdempotencyConflict for
+    a key that belongs to a different order.
+
+    Keys are scoped to the order's userId. A new order is inserted; a key
+    the same user used before returns the order placed with it (replayed). A concurrent retry waits on the first attempt's key: it
+    gets the committed order, or places its own if the first attempt rolled
+    back. The same key twice in one call places the order once.
+    """
+    records = []
+    for order, key in orders:
+        records.append({
+            "id": str(uuid.uuid4()),
+            "idempotency_key": key,
+            "request_hash": request_hash(order) if key is not None else None,
+            "user_id": order["userId"],
+            "restaurant_id": order["restaurantId"],
+            "delivery_address": order["deliveryAddress"],
+            "order_amount": order["orderAmount"],
+            "delivery_charges": order["deliveryCharges"],
+            "tax_amount": order["taxAmount"],
+            "total_amount": order["totalAmount"],
+            "payment_method": order["paymentMethod"],
+            "special_instructions": order["specialInstructions"],
+            "items": order["items"],
+        })
+    cur.execute(PLACE_ORDERS_SQL, (json.dumps(records), notes))
+    placed = {str(row[0]): row for row in cur.fetchall()}
+
+    replayed = {}
+    used = [r for r in records if r["id"] not in placed]
+    if used:
+        cur.execute("""
+            SELECT r.user_id::text, r.idempotency_key, r.request_hash, """ + ORDER_COLUMNS + """
+            FROM order_requests r
+            JOIN unnest(%s::uuid[], %s::text[]) AS k(user_id, idempotency_key) USING (user_id, idempotency_key)
+            LEFT JOIN orders o ON o.id = r.order_id
+        """, ([r["user_id"] for r in used], [r["idempotency_key"] for r in used]))
+        replayed = {(row[0], row[1]): row[1:] for row in cur.fetchall()}
+
+    results = []
+    for record in records:
+        row = placed.get(record["id"])
+        if row is not None:
+            results.append((row, False))
+            continue
+        existing = replayed.get((record["user_id"], record["idempotency_key"]))
+        if existing is None or existing[1] != record["request_hash"] or existing[2] is None:
+            results.append(IdempotencyConflict("idempotencyKey was already used for a different order"))
+        else:
+            results.append((existing[2:], True))
+    return results
+
+
+def place_order(cur, order, idempotency_key=None, notes="Order placed via placeOrder"):
+    """
+    Insert `order` unless `idempotency_key` was already used; returns (row, replayed).
+    Raises IdempotencyConflict if the key belongs to a different order.
+    """
+    result = place_orders(cur, [(order, idempotency_key)], notes)[0]
+    if isinstance(result, IdempotencyConflict):
+        raise result
+    return result
+
+
+class OrderQueue:
+    """
+    Bounded write-behind queue that places orders in group commits.
+
+    submit() queues a validated order and returns a Future. Writer threads,
+    started on the first submit, take up to `max_batch` queued orders at a
+    time and hand them to `writer(batch)`, which places them all in one
+    transaction and returns one (row, replayed) or exception per order. A
+    batch costs one commit (one WAL flush) instead of one per order, and
+    orders arriving while a commit is in flight make the next batch bigger.
+
+    A future is resolved only after its batch has committed, so a caller that
+    got its order id back has a durable order. If a batch fails, its orders
+    are retried one per transaction so only the broken ones fail, except on
+    one of the `fail_fast` errors (no connection, database unreachable):
+    those would fail every retry too, each after its own wait, so the whole
+    batch fails at once.
+    """
+
+    def __init__(self, writer, max_pending=2000, max_batch=100, linger=0.0, writers=1, fail_fast=()):
+        self.writer = writer
+        self.fail_fast = tuple(fail_fast)
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.linger = linger
+        self.writers = writers
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._queue = deque()  # (order, idempotency_key, future)
+        self._threads = []
+        self._stopped = False
+
+        self.submitted = 0
+        self.rejected = 0
+        self.batches = 0
+        self.placed = 0
+        self.failed = 0
+        self.largest_batch = 0
+
+    def submit(self, order, idempotency_key=None):
+        """Queue a validated order; the future resolves to (row, replayed) once committed."""
+        future = Future()
+        with self._lock:
+            if self._stopped:
+                raise QueueFull("order queue is shut down")
+            if len(self._queue) >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull(f"{len(self._queue)} orders waiting to be written")
+            self._queue.append((order, idempotency_key, future))
+            self.submitted += 1
+            if not self._threads:
+                for n in range(self.writers):
+                    thread = threading.Thread(target=self._run, name=f"order-writer-{n}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+            self._ready.notify()
+        return future
+
+    def pending(self):
+        with self._lock:
+            return len(self._queue)
+
+    def _take(self):
+        with self._lock:
+            while not self._queue and not self._stopped:
+                self._ready.wait()
+            if self.linger and len(self._queue) < self.max_batch and not self._stopped:
+                deadline = time.monotonic() + self.linger
+                while len(self._queue) < self.max_batch and not self._stopped:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._ready.wait(remaining)
+            count = min(len(self._queue), self.max_batch)
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            batch = self._take()
+            if not batch:
+                return  # stopped and drained
+            self._write(batch)
+
+    def _write(self, batch):
+        try:
+            results = self.writer([(order, key) for order, key, _ in batch])
+        except Exception as e:
+            if len(batch) == 1 or isinstance(e, self.fail_fast):
+                if len(batch) > 1:
+                    print(f"Error committing {len(batch)} queued orders: {e}")
+                with self._lock:
+                    self.failed += len(batch)
+                for _, _, future in batch:
+                    future.set_exception(e)
+                return
+            print(f"Error committing {len(batch)} queued orders, retrying one by one: {e}")
+            for item in batch:
+                self._write([item])
+            return
+        with self._lock:
+            self.batches += 1
+            self.placed += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+        for (_, _, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        """Stop taking orders and wait for the writers to commit everything queued."""
+        with self._lock:
+            self._stopped = True
+            self._ready.notify_all()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "pending": len(self._queue),
+                "batches": self.batches,
+                "placed": self.placed,
+                "failed": self.failed,
+                "largestBatch": self.largest_batch,
+            }
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import re
+from collections import OrderedDict
+
+import psycopg2
+from psycopg2 import errors, extensions
+
+# A statement is prepared on a connection once it has run this many times there
+PREPARE_THRESHOLD = int(os.getenv("PREPARE_THRESHOLD", "5"))
+# Prepared statements kept per connection (least recently used are deallocated); 0 disables
+PREPARED_STATEMENTS_MAX = int(os.getenv("PREPARED_STATEMENTS_MAX", "100"))
+
+_PREPARABLE = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "VALUES"}
+_PLACEHOLDER = re.compile(r"%%|%s")
+_LEADING_WORD = re.compile(r"\s*\(?\s*(\w+)")
+# Distinct not-yet-prepared statements counted per connection before the counts reset
+_MAX_TRACKED = 1000
+
+
+class PreparingConnection(extensions.connection):
+    """Connection that remembers which statements it has prepared server-side."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = OrderedDict()  # query -> EXECUTE statement
+        self.executions = {}  # query -> runs so far, until prepared
+        self.unpreparable = set()
+
+
+class PreparingCursor(extensions.cursor):
+    """
+    Cursor that runs hot statements as EXECUTE of a per-connection prepared
+    statement, so Postgres parses and plans them once per connection.
+
+    Only positional (%s) SELECT/INSERT/UPDATE/DELETE/WITH/VALUES statements on
+    a PreparingConnection are considered; everything else runs as is. A new
+    connection starts with an empty cache, so statements are re-prepared after
+    a reconnect, and one the server no longer knows (DISCARD ALL) is forgotten
+    and re-prepared on next use.
+    """
+
+    def execute(self, query, vars=None):
+        conn = self.connection
+        statement = _statement(conn, query, vars)
+        if statement is None:
+            return super().execute(query, vars)
+        idle = conn.info.transaction_status == extensions.TRANSACTION_STATUS_IDLE
+        try:
+            return super().execute(statement, vars)
+        except errors.InvalidSqlStatementName:
+            conn.prepared.clear()
+            if not idle:
+                raise
+            # Nothing else ran in this transaction yet, so it is safe to retry
+            conn.rollback()
+            return super().execute(query, vars)
+
+
+def _statement(conn, query, vars):
+    """The EXECUTE statement for `query`, preparing it if it just became hot; None to run it as is."""
+    if PREPARED_STATEMENTS_MAX <= 0 or not isinstance(conn, PreparingConnection):
+        return None
+    statement = conn.prepared.get(query)
+    if statement is not None:
+        conn.prepared.move_to_end(query)
+        return statement
+    if query in conn.unpreparable or not isinstance(vars, (tuple, list, type(None))):
+        return None
+    if vars and any(isinstance(v, tuple) for v in vars):
+        # psycopg2 expands a tuple into a SQL list (IN %s), which a $n parameter can't stand for
+        return None
+
+    runs = conn.executions.get(query, 0) + 1
+    if runs < PREPARE_THRESHOLD:
+        if len(conn.executions) >= _MAX_TRACKED:
+            conn.executions.clear()
+        conn.executions[query] = runs
+        return None
+    conn.executions.pop(query, None)
+
+    statement = _prepare(conn, query, len(vars or ()))
+    if statement is None:
+        conn.unpreparable.add(query)
+        return None
+    conn.prepared[query] = statement
+    return statement
+
+
+def _prepare(conn, query, nparams):
+    text = query.decode() if isinstance(query, bytes) else query
+    match = _LEADING_WORD.match(text)
+    if not match or match.group(1).upper() not in _PREPARABLE or "%(" in text:
+        return None
+    if conn.info.transaction_status == extensions.TRANSACTION_STATUS_INERROR:
+        return None
+
+    if _PLACEHOLDER.findall(text).count("%s") != nparams:
+        return None  # psycopg2 reports the mismatch when the query runs unprepared
+    numbered = iter(range(1, nparams + 1))
+    body = _PLACEHOLDER.sub(lambda m: "%" if m.group(0) == "%%" else f"${next(numbered)}", text)
+    name = "ps_" + hashlib.sha1(text.encode()).hexdigest()[:20]
+
+    evicted = []
+    while len(conn.prepared) >= PREPARED_STATEMENTS_MAX:
+        evicted.append(conn.prepared.popitem(last=False))
+    try:
+        types = _run_prepare(conn, name, body, nparams, evicted)
+    except errors.InvalidSqlStatementName:
+        # An evicted statement is gone from the server (DISCARD ALL): so is the rest of the cache
+        conn.prepared.clear()
+        try:
+            types = _run_prepare(conn, name, body, nparams, [])
+        except psycopg2.Error:
+            return None
+    except psycopg2.Error:
+        for old_query, old_statement in reversed(evicted):
+            # Their DEALLOCATEs were rolled back with the savepoint
+            conn.prepared[old_query] = old_statement
+            conn.prepared.move_to_end(old_query, last=False)
+        return None
+    if types is None:
+        return None
+
+    if not types:
+        return f"EXECUTE {name}"
+    # Cast each value to the type Postgres inferred, e.g. a list to uuid[]
+    return f"EXECUTE {name} (" + ", ".join(f"%s::{t}" for t in types) + ")"
+
+
+def _run_prepare(conn, name, body, nparams, evicted):
+    """
+    DEALLOCATE the `evicted` (query, statement) pairs and PREPARE `name`,
+    inside a savepoint so a failure leaves the caller's transaction usable.
+    Returns the parameter types, or None when Postgres infers a different
+    number of parameters; raises psycopg2.Error when a statement fails.
+    """
+    # A savepoint keeps a failed PREPARE or DEALLOCATE from aborting the caller's transaction
+    guarded = not conn.autocommit
+    sql = ["SAVEPOINT prepare_statement"] if guarded else []
+    sql += [f"DEALLOCATE {statement.split()[1]}" for _, statement in evicted]
+    sql.append(f"PREPARE {name} AS {body}")
+    if guarded:
+        sql.append("RELEASE SAVEPOINT prepare_statement")
+    sql.append(f"SELECT parameter_types::text[] FROM pg_prepared_statements WHERE name = '{name}'")
+
+    with conn.cursor(cursor_factory=extensions.cursor) as cur:
+        try:
+            cur.execute(";\n".join(sql))
+            types = cur.fetchone()[0] or []
+        except psycopg2.Error:
+            if guarded:
+                cur.execute("ROLLBACK TO SAVEPOINT prepare_statement; RELEASE SAVEPOINT prepare_statement")
+            raise
+        if len(types) != nparams:
+            cur.execute(f"DEALLOCATE {name}")
+            return None
+    return types
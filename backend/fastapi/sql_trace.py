@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+
+# Statements slower than this are printed to the slow-query log (0 disables)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+# Allow clients to ask for a per-request SQL trace with the X-SQL-Trace: 1 header.
+# Off by default: the trace exposes query shapes.
+SQL_TRACE_ENABLED = os.getenv("SQL_TRACE_ENABLED", "0") == "1"
+TRACE_HEADER = "x-sql-trace"
+# Distinct statements listed in the trace header
+TRACE_MAX_STATEMENTS = 20
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:''|[^'])*'")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s")
+_NUMBERS = re.compile(r"(?<![\w.$])-?\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(query):
+    """
+    Normalised statement text with every literal and bind parameter
+    replaced by `?`, so calls that differ only in values group together.
+    """
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    text = _COMMENTS.sub(" ", query)
+    text = _STRINGS.sub("?", text)
+    text = _PLACEHOLDERS.sub("?", text)
+    text = _NUMBERS.sub("?", text)
+    text = _LISTS.sub("(...)", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def fingerprint_id(text):
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+def redact(params):
+    """Describe bind parameters by type and size only; values are never logged."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {k: _describe(v) for k, v in params.items()}
+    try:
+        return [_describe(v) for v in params]
+    except TypeError:
+        return _describe(params)
+
+
+def _describe(value):
+    if value is None:
+        return "null"
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}({len(value)})"
+    return type(value).__name__
+
+
+def log_slow(endpoint, query, params, seconds, rows):
+    text = fingerprint(query)
+    print("Slow query: " + json.dumps({
+        "endpoint": endpoint,
+        "ms": round(seconds * 1000, 2),
+        "rows": rows,
+        "id": fingerprint_id(text),
+        "sql": text,
+        "params": redact(params),
+    }, default=str))
+
+
+def trace_header(statements):
+    """
+    Summarise [(query, seconds, rows), ...] for the X-SQL-Trace response header:
+    totals plus the slowest statements grouped by fingerprint, so an N+1
+    shows up as one entry with a high call count.
+    """
+    groups = {}
+    for query, seconds, rows in statements:
+        text = fingerprint(query)
+        group = groups.get(text)
+        if group is None:
+            group = groups[text] = [0, 0.0, 0]
+        group[0] += 1
+        group[1] += seconds
+        group[2] += max(rows, 0)
+    ordered = sorted(groups.items(), key=lambda item: item[1][1], reverse=True)
+    return json.dumps({
+        "queries": len(statements),
+        "ms": round(sum(s for _, s, _ in statements) * 1000, 2),
+        "statements": [
+            {"id": fingerprint_id(text), "calls": calls, "ms": round(seconds * 1000, 2), "rows": rows,
+             "sql": text[:200]}
+            for text, (calls, seconds, rows) in ordered[:TRACE_MAX_STATEMENTS]
+        ],
+    }, separators=(",", ":"))
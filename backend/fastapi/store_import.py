@@ -0,0 +1,244 @@
+import csv
+import io
+import re
+import uuid
+
+DAYS = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY"]
+# Short names sent by the admin app (MON, TUE, ...)
+DAY_ALIASES = {day[:3]: day for day in DAYS}
+
+# CSV header accepted by bulkCreateStores (text/csv bodies). List columns:
+#   cuisines      "Italian|Pizza"
+#   openingTimes  "MONDAY 09:00-22:00;TUESDAY 09:00-22:00;SUNDAY closed"
+CSV_COLUMNS = [
+    "name", "address", "image", "logo", "phone", "deliveryTime", "minimumOrder",
+    "tax", "slug", "owner", "shopType", "cuisines", "openingTimes",
+]
+
+_TIME = re.compile(r"^([01]?\d|2[0-3]):[0-5]\d(:[0-5]\d)?$")
+_UUID = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+
+
+def normalize_day(value):
+    """'mon', 'MON' or 'Monday' -> 'MONDAY'; None for anything else."""
+    day = str(value or "").strip().upper()
+    day = DAY_ALIASES.get(day, day)
+    return day if day in DAYS else None
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _number(value, field, errors, cast=float):
+    if _blank(value):
+        return None
+    try:
+        number = cast(value)
+    except (TypeError, ValueError):
+        errors.append(f"{field} must be a number")
+        return None
+    if number < 0:
+        errors.append(f"{field} must not be negative")
+    return number
+
+
+def validate_store(raw, default_owner=None):
+    """
+    Check one store from a bulk import and normalise it.
+    Returns (store, errors); `store` is None when there are errors.
+    """
+    errors = []
+    if not isinstance(raw, dict):
+        return None, ["store must be an object"]
+
+    name = raw.get("name")
+    address = raw.get("address")
+    if _blank(name):
+        errors.append("name is required")
+    elif not isinstance(name, str):
+        errors.append("name must be a string")
+    if _blank(address):
+        errors.append("address is required")
+    elif not isinstance(address, str):
+        errors.append("address must be a string")
+    for field in ("image", "logo", "phone", "slug", "shopType"):
+        if raw.get(field) is not None and not isinstance(raw[field], str):
+            errors.append(f"{field} must be a string")
+
+    owner = raw.get("owner") or default_owner
+    if owner and not _UUID.match(str(owner)):
+        errors.append("owner must be a UUID")
+
+    delivery_time = _number(raw.get("deliveryTime"), "deliveryTime", errors, cast=int)
+    minimum_order = _number(raw.get("minimumOrder"), "minimumOrder", errors)
+    tax = _number(raw.get("tax"), "tax", errors)
+
+    cuisines = raw.get("cuisines") or []
+    if not isinstance(cuisines, list) or not all(isinstance(c, str) for c in cuisines):
+        errors.append("cuisines must be a list of strings")
+        cuisines = []
+
+    opening_times = []
+    seen_days = set()
+    raw_times = raw.get("openingTimes") or []
+    if not isinstance(raw_times, list):
+        errors.append("openingTimes must be a list")
+        raw_times = []
+    for ot in raw_times:
+        day = normalize_day(ot.get("day")) if isinstance(ot, dict) else None
+        if day is None:
+            errors.append(f"invalid opening day: {ot.get('day') if isinstance(ot, dict) else ot}")
+            continue
+        if day in seen_days:
+            errors.append(f"duplicate opening day: {day}")
+            continue
+        seen_days.add(day)
+        start, end = ot.get("startTime"), ot.get("endTime")
+        if not _TIME.match(str(start or "")) or not _TIME.match(str(end or "")):
+            errors.append(f"{day}: times must be HH:MM")
+            continue
+        opening_times.append((day, start, end, bool(ot.get("isClosed", False))))
+
+    if errors:
+        return None, errors
+    return {
+        "id": str(uuid.uuid4()),
+        "name": name.strip(),
+        "address": address.strip(),
+        "image": raw.get("image") or None,
+        "logo": raw.get("logo") or None,
+        "phone": raw.get("phone") or None,
+        "delivery_time": delivery_time if delivery_time is not None else 30,
+        "minimum_order": minimum_order or 0,
+        "tax": tax or 0,
+        "slug": raw.get("slug") or None,
+        "owner_id": str(owner) if owner else None,
+        "shop_type": raw.get("shopType") or None,
+        "cuisines": cuisines,
+        "opening_times": opening_times,
+    }, []
+
+
+def csv_record_to_store(record):
+    """Turn a CSV row (dict keyed by CSV_COLUMNS) into the JSON store shape."""
+    store = {k: (v if v != "" else None) for k, v in record.items() if k in CSV_COLUMNS}
+    store["cuisines"] = [c.strip() for c in (record.get("cuisines") or "").split("|") if c.strip()]
+    opening_times = []
+    for part in (record.get("openingTimes") or "").split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        day, _, hours = part.partition(" ")
+        if hours.strip().lower() == "closed":
+            opening_times.append({"day": day, "startTime": "00:00", "endTime": "00:00", "isClosed": True})
+        else:
+            start, _, end = hours.strip().partition("-")
+            opening_times.append({"day": day, "startTime": start, "endTime": end})
+    store["openingTimes"] = opening_times
+    return store
+
+
+class CsvStream:
+    """
+    Incremental CSV reader for streamed bodies: feed() text chunks and get
+    back complete records (dicts), including quoted fields spanning lines.
+    """
+
+    def __init__(self):
+        self.header = None
+        self._buf = ""
+
+    def feed(self, text, final=False):
+        self._buf += text
+        cut = len(self._buf) if final else self._complete_prefix()
+        chunk, self._buf = self._buf[:cut], self._buf[cut:]
+        rows = list(csv.reader(io.StringIO(chunk)))
+        records = []
+        for row in rows:
+            if not row:
+                continue
+            if self.header is None:
+                self.header = [h.strip() for h in row]
+                continue
+            records.append(dict(zip(self.header, row)))
+        return records
+
+    def _complete_prefix(self):
+        # End of the last newline that is outside a quoted field
+        in_quotes = False
+        cut = 0
+        for i, char in enumerate(self._buf):
+            if char == '"':
+                in_quotes = not in_quotes
+            elif char == "\n" and not in_quotes:
+                cut = i + 1
+        return cut
+
+
+def _copy_text(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, list):
+        value = "{" + ",".join('"' + v.replace("\\", "\\\\").replace('"', '\\"') + '"' for v in value) + "}"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def copy_rows(cur, table, columns, rows):
+    """Load `rows` into `table` with a single COPY ... FROM STDIN."""
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(_copy_text(v) for v in row))
+        buf.write("\n")
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buf)
+
+
+def load_stores(cur, stores):
+    """
+    Insert validated stores, their settings and opening times with three COPYs.
+    Returns {index: [errors]} for stores rejected by database pre-checks
+    (unknown owner, slug already taken); the rest are loaded.
+    """
+    errors = {}
+
+    owners = {s["owner_id"] for _, s in stores if s["owner_id"]}
+    if owners:
+        cur.execute("SELECT id::text FROM users WHERE id = ANY(%s::uuid[])", (list(owners),))
+        known = {row[0] for row in cur.fetchall()}
+        for index, store in stores:
+            if store["owner_id"] and store["owner_id"] not in known:
+                errors.setdefault(index, []).append("owner not found")
+
+    slugs = [s["slug"] for _, s in stores if s["slug"]]
+    if slugs:
+        cur.execute("SELECT slug FROM restaurants WHERE slug = ANY(%s)", (slugs,))
+        taken = {row[0] for row in cur.fetchall()}
+        seen = set()
+        for index, store in stores:
+            slug = store["slug"]
+            if not slug:
+                continue
+            if slug in taken:
+                errors.setdefault(index, []).append(f"slug already exists: {slug}")
+            elif slug in seen:
+                errors.setdefault(index, []).append(f"duplicate slug in batch: {slug}")
+            seen.add(slug)
+
+    accepted = [s for index, s in stores if index not in errors]
+    if accepted:
+        copy_rows(cur, "restaurants", [
+            "id", "name", "address", "image", "logo", "phone", "delivery_time",
+            "owner_id", "slug", "shop_type", "cuisines",
+        ], [(
+            s["id"], s["name"], s["address"], s["image"], s["logo"], s["phone"], s["delivery_time"],
+            s["owner_id"], s["slug"], s["shop_type"], s["cuisines"],
+        ) for s in accepted])
+        copy_rows(cur, "restaurant_settings", ["restaurant_id", "minimum_order", "tax"],
+                  [(s["id"], s["minimum_order"], s["tax"]) for s in accepted])
+        copy_rows(cur, "opening_times", ["restaurant_id", "day", "start_time", "end_time", "is_closed"],
+                  [(s["id"],) + ot for s in accepted for ot in s["opening_times"]])
+    return errors
@@ -0,0 +1,217 @@
+import base64
+import binascii
+import hashlib
+import os
+import re
+import uuid
+
+from fastapi.concurrency import run_in_threadpool
+
+# Largest decoded image accepted by uploadImageToS3
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(10 * 1024 * 1024)))
+# Decoded bytes buffered before each disk write
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(256 * 1024)))
+
+# Room for the rest of the Hasura payload (action, session_variables, ...)
+_ENVELOPE_BYTES = 64 * 1024
+_MAX_HEADER_BYTES = 256
+_IMAGE_KEY = re.compile(rb'(?<!\\)"image"\s*:\s*"')
+_WHITESPACE = b" \t\r\n"
+_CONTENT_NAME = re.compile(r"^[0-9a-f]{64}(_w\d+)?\.[a-z0-9]+$")
+
+
+class UploadError(Exception):
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ImageFieldParser:
+    """
+    Incrementally extracts input.image from a Hasura action payload.
+
+    feed() takes raw body chunks and returns the base64 text of the image seen
+    so far (data URL header stripped, JSON escapes undone); nothing else in
+    the body is kept.
+    """
+
+    def __init__(self):
+        self.state = "key"
+        self.header = None
+        self.done = False
+        self._buf = b""
+        self._escape = False
+
+    def feed(self, chunk):
+        out = bytearray()
+        data = self._buf + chunk
+        self._buf = b""
+        pos = 0
+
+        if self.state == "key":
+            match = _IMAGE_KEY.search(data)
+            if not match:
+                # Keep a tail in case the key is split across chunks
+                self._buf = data[-32:]
+                return b""
+            pos = match.end()
+            self.state = "start"
+
+        if self.state == "start":
+            head = data[pos:pos + _MAX_HEADER_BYTES]
+            if len(head) < 5 and b'"' not in head:
+                self._buf = data[pos:]
+                return b""
+            if head.startswith(b"data:"):
+                comma = head.find(b",")
+                if comma < 0:
+                    if len(head) >= _MAX_HEADER_BYTES or b'"' in head:
+                        raise UploadError(400, "Malformed data URL")
+                    self._buf = data[pos:]
+                    return b""
+                self.header = head[:comma].decode("ascii", "replace")
+                pos += comma + 1
+            else:
+                self.header = ""
+            self.state = "payload"
+
+        while pos < len(data):
+            if self._escape:
+                char = data[pos:pos + 1]
+                if char == b"/":
+                    out += b"/"
+                elif char not in (b"n", b"r", b"t"):
+                    raise UploadError(400, "Unexpected escape in image data")
+                self._escape = False
+                pos += 1
+                continue
+            quote = data.find(b'"', pos)
+            backslash = data.find(b"\\", pos)
+            stop = min(i for i in (quote, backslash, len(data)) if i >= 0)
+            out += data[pos:stop]
+            if stop == len(data):
+                break
+            if stop == backslash:
+                self._escape = True
+                pos = stop + 1
+            else:
+                self.done = True
+                self.state = "done"
+                break
+        return bytes(out)
+
+
+class Base64Stream:
+    """Decodes base64 text in arbitrary slices, carrying partial quanta over."""
+
+    def __init__(self):
+        self._carry = b""
+
+    def decode(self, text):
+        data = self._carry + text.translate(None, _WHITESPACE)
+        usable = len(data) // 4 * 4
+        self._carry = data[usable:]
+        try:
+            return base64.b64decode(data[:usable], validate=True)
+        except binascii.Error as e:
+            raise UploadError(400, f"Invalid base64 image data: {e}")
+
+    def finish(self):
+        if self._carry:
+            raise UploadError(400, "Truncated base64 image data")
+        return b""
+
+
+def content_name(hexdigest, ext):
+    return f"{hexdigest}.{ext}"
+
+
+def is_content_name(file_name):
+    """True for <sha256>.<ext> names and their <sha256>_w<width>.webp variants."""
+    return _CONTENT_NAME.match(file_name) is not None
+
+
+def extension_for(header):
+    # Try to guess extension from header
+    if "jpeg" in header or "jpg" in header:
+        return "jpg"
+    if "webp" in header:
+        return "webp"
+    return "png"
+
+
+async def save_image_upload(request, upload_dir, max_bytes=MAX_IMAGE_BYTES, chunk_bytes=UPLOAD_CHUNK_BYTES):
+    """
+    Stream the request body, decode input.image and write it under `upload_dir`.
+
+    The body is never buffered whole: base64 is decoded as it arrives and
+    written in `chunk_bytes` pieces from a worker thread, so the event loop
+    is not blocked on disk.
+
+    Files are named by the SHA-256 of their content. Images smaller than
+    `chunk_bytes` are not written at all when that file already exists;
+    larger ones are streamed to a temp file that is discarded.
+    Returns (file_name, created).
+    """
+    content_length = request.headers.get("content-length")
+    if content_length:
+        try:
+            content_length = int(content_length)
+        except ValueError:
+            raise UploadError(400, "Malformed Content-Length header")
+    if content_length and content_length > max_bytes * 4 // 3 + _ENVELOPE_BYTES:
+        raise UploadError(413, f"Image exceeds the {max_bytes} byte limit")
+
+    parser = ImageFieldParser()
+    decoder = Base64Stream()
+    digest = hashlib.sha256()
+    pending = bytearray()
+    written = 0
+    tmp_path = os.path.join(upload_dir, f".upload-{uuid.uuid4()}.tmp")
+    f = None
+    try:
+        async for chunk in request.stream():
+            if parser.done:
+                continue  # drain the rest of the body
+            text = parser.feed(chunk)
+            if not text:
+                continue
+            decoded = decoder.decode(text)
+            digest.update(decoded)
+            pending += decoded
+            if written + len(pending) > max_bytes:
+                raise UploadError(413, f"Image exceeds the {max_bytes} byte limit")
+            if len(pending) >= chunk_bytes:
+                if f is None:
+                    f = await run_in_threadpool(open, tmp_path, "wb")
+                await run_in_threadpool(f.write, bytes(pending))
+                written += len(pending)
+                pending.clear()
+
+        if not parser.done:
+            raise UploadError(400, "No image data provided")
+        pending += decoder.finish()
+        if written + len(pending) == 0:
+            raise UploadError(400, "No image data provided")
+
+        file_name = content_name(digest.hexdigest(), extension_for(parser.header))
+        file_path = os.path.join(upload_dir, file_name)
+        if await run_in_threadpool(os.path.exists, file_path):
+            # Duplicate upload: keep the existing file
+            if f is not None:
+                await run_in_threadpool(f.close)
+                await run_in_threadpool(os.remove, tmp_path)
+            return file_name, False
+
+        if f is None:
+            f = await run_in_threadpool(open, tmp_path, "wb")
+        await run_in_threadpool(f.write, bytes(pending))
+        await run_in_threadpool(f.close)
+        await run_in_threadpool(os.replace, tmp_path, file_path)
+        return file_name, True
+    except BaseException:
+        if f is not None:
+            await run_in_threadpool(f.close)
+        if os.path.exists(tmp_path):
+            await run_in_threadpool(os.remove, tmp_path)
+        raise
@@ -0,0 +1,50 @@
+-- ============================================
+-- ORDER EVENTS (orderEvents push channel)
+-- ============================================
+-- Every new order, and every order whose status or rider changes, is sent
+-- on the order_events channel as JSON. Each FastAPI worker LISTENs on one
+-- connection and fans the events out to its SSE/WebSocket subscribers
+-- (order_events.py), instead of the apps polling orders through Hasura.
+--
+-- Notifications are delivered when the transaction commits, in commit order,
+-- and only to listeners connected at that time; subscribers refetch after
+-- reconnecting. A payload stays far below NOTIFY's 8000 byte limit.
+--
+-- riderId/previousRiderId are the riders' user ids (riders_data.user_id), the
+-- ids nearestRiders, riderLocations and updateRiderLocations use, not
+-- orders.rider_id.
+
+-- Statement triggers, so a group commit or bulk update runs the function once
+-- and sends one notification per order it changed
+CREATE OR REPLACE FUNCTION notify_order_events()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM pg_notify('order_events', json_build_object(
+            'id', n.id, 'orderId', n.order_id, 'status', n.status, 'previousStatus', NULL,
+            'restaurantId', n.restaurant_id, 'riderId', r.user_id, 'previousRiderId', NULL,
+            'userId', n.user_id, 'at', COALESCE(n.updated_at, NOW()))::text)
+        FROM new_rows n
+        LEFT JOIN riders_data r ON r.id = n.rider_id;
+    ELSE
+        PERFORM pg_notify('order_events', json_build_object(
+            'id', n.id, 'orderId', n.order_id, 'status', n.status, 'previousStatus', o.status,
+            'restaurantId', n.restaurant_id, 'riderId', r.user_id, 'previousRiderId', pr.user_id,
+            'userId', n.user_id, 'at', COALESCE(n.updated_at, NOW()))::text)
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        LEFT JOIN riders_data r ON r.id = n.rider_id
+        LEFT JOIN riders_data pr ON pr.id = o.rider_id
+        WHERE n.status IS DISTINCT FROM o.status OR n.rider_id IS DISTINCT FROM o.rider_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS order_events_insert ON orders;
+CREATE TRIGGER order_events_insert AFTER INSERT ON orders REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_order_events();
+
+DROP TRIGGER IF EXISTS order_events_update ON orders;
+CREATE TRIGGER order_events_update AFTER UPDATE ON orders REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_order_events();
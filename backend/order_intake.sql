@@ -0,0 +1,21 @@
+-- ============================================
+-- ORDER INTAKE IDEMPOTENCY (placeOrder)
+-- ============================================
+
+CREATE SEQUENCE IF NOT EXISTS order_id_seq;
+
+-- One row per client idempotency key, scoped to the ordering user so one user
+-- cannot replay or probe another's keys. A retried placeOrder with the same key
+-- and the same order returns the order created first; the same key with a
+-- different order is rejected. Rows can be purged once clients stop retrying, e.g.
+--   DELETE FROM order_requests WHERE created_at < NOW() - INTERVAL '7 days';
+CREATE TABLE IF NOT EXISTS order_requests (
+    user_id UUID NOT NULL,
+    idempotency_key TEXT NOT NULL,
+    request_hash TEXT NOT NULL,
+    order_id UUID REFERENCES orders(id) ON DELETE CASCADE,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (user_id, idempotency_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_order_requests_created ON order_requests(created_at);
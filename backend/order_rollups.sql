@@ -0,0 +1,267 @@
+-- ============================================
+-- ORDER ROLLUPS (getDashboardOrdersByType / getDashboardSalesByType / orderStats)
+-- ============================================
+-- Run after dashboard_stats_tables.sql: replaces its placeholder order and
+-- sales functions with reads of rollups that refresh_order_rollups() keeps up
+-- to date from the orders changed since its last run.
+
+-- Orders and sales per UTC hour / UTC day of order_date, restaurant, current
+-- status and payment method. An order counts where it is now: a status change
+-- moves it from one row to another. Rows can drop to 0 and are kept.
+CREATE TABLE IF NOT EXISTS order_rollups_hourly (
+    hour TIMESTAMP WITH TIME ZONE NOT NULL, -- start of the UTC hour
+    restaurant_id UUID,
+    status TEXT NOT NULL,
+    payment_method TEXT,
+    order_count BIGINT NOT NULL DEFAULT 0,
+    order_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    total_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    CONSTRAINT order_rollups_hourly_key UNIQUE NULLS NOT DISTINCT (hour, restaurant_id, status, payment_method)
+);
+
+CREATE TABLE IF NOT EXISTS order_rollups_daily (
+    day DATE NOT NULL, -- UTC day
+    restaurant_id UUID,
+    status TEXT NOT NULL,
+    payment_method TEXT,
+    order_count BIGINT NOT NULL DEFAULT 0,
+    order_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    total_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    CONSTRAINT order_rollups_daily_key UNIQUE NULLS NOT DISTINCT (day, restaurant_id, status, payment_method)
+);
+
+-- Date ranges of one restaurant
+CREATE INDEX IF NOT EXISTS idx_order_rollups_hourly_restaurant ON order_rollups_hourly(restaurant_id, hour);
+CREATE INDEX IF NOT EXISTS idx_order_rollups_daily_restaurant ON order_rollups_daily(restaurant_id, day);
+
+-- All-time totals for the dashboard cards: one row per status and payment method
+CREATE TABLE IF NOT EXISTS order_rollup_totals (
+    status TEXT NOT NULL,
+    payment_method TEXT,
+    order_count BIGINT NOT NULL DEFAULT 0,
+    order_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    total_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    CONSTRAINT order_rollup_totals_key UNIQUE NULLS NOT DISTINCT (status, payment_method)
+);
+
+-- What each order currently contributes to the rollups. Applying an order
+-- again subtracts this and adds what it contributes now, so re-reading an
+-- order is harmless and only real changes move the rollups.
+CREATE TABLE IF NOT EXISTS order_rollup_state (
+    order_id UUID PRIMARY KEY,
+    hour TIMESTAMP WITH TIME ZONE NOT NULL,
+    restaurant_id UUID,
+    status TEXT NOT NULL,
+    payment_method TEXT,
+    order_amount DECIMAL(10, 2) NOT NULL,
+    total_amount DECIMAL(10, 2) NOT NULL
+);
+
+-- Position of the last order applied, in (updated_at, id) order
+CREATE TABLE IF NOT EXISTS order_rollup_watermark (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT '-infinity',
+    order_id UUID NOT NULL DEFAULT '00000000-0000-0000-0000-000000000000',
+    refreshed_at TIMESTAMP WITH TIME ZONE
+);
+INSERT INTO order_rollup_watermark DEFAULT VALUES ON CONFLICT DO NOTHING;
+
+-- Deleted orders leave no row to find by updated_at: their ids wait here
+CREATE TABLE IF NOT EXISTS order_rollup_deletes (
+    order_id UUID NOT NULL
+);
+
+-- Orders are read in watermark order; the update trigger from mvp_schema.sql
+-- keeps updated_at current
+CREATE INDEX IF NOT EXISTS idx_orders_updated_at ON orders(updated_at, id);
+
+CREATE OR REPLACE FUNCTION log_order_rollup_deletes()
+RETURNS trigger AS $$
+BEGIN
+    INSERT INTO order_rollup_deletes (order_id) SELECT id FROM old_rows;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS order_rollup_delete ON orders;
+CREATE TRIGGER order_rollup_delete AFTER DELETE ON orders REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION log_order_rollup_deletes();
+
+-- Bring the rollups in line with orders `ids` as they are now (a missing
+-- order counts as deleted). Callers hold the order_rollups advisory lock.
+-- Returns the number of orders whose contribution changed.
+CREATE OR REPLACE FUNCTION apply_order_rollup_changes(ids UUID[])
+RETURNS INT AS $$
+DECLARE
+    changed_count INT;
+BEGIN
+    WITH wanted AS (
+        SELECT DISTINCT id FROM unnest(ids) AS id
+    ),
+    changed AS (
+        SELECT * FROM (
+            SELECT w.id, o.id IS NOT NULL AS present, s.order_id IS NOT NULL AS counted,
+                   CASE WHEN o.id IS NOT NULL THEN
+                       date_trunc('hour', COALESCE(o.order_date, o.created_at, 'epoch') AT TIME ZONE 'UTC')
+                           AT TIME ZONE 'UTC'
+                   END AS hour,
+                   o.restaurant_id, o.status, o.payment_method, o.order_amount, o.total_amount,
+                   s.hour AS old_hour, s.restaurant_id AS old_restaurant_id, s.status AS old_status,
+                   s.payment_method AS old_payment_method, s.order_amount AS old_order_amount,
+                   s.total_amount AS old_total_amount
+            FROM wanted w
+            LEFT JOIN orders o ON o.id = w.id
+            LEFT JOIN order_rollup_state s ON s.order_id = w.id
+        ) c
+        WHERE (hour, restaurant_id, status, payment_method, order_amount, total_amount)
+              IS DISTINCT FROM
+              (old_hour, old_restaurant_id, old_status, old_payment_method, old_order_amount, old_total_amount)
+    ),
+    deltas AS (
+        SELECT hour, restaurant_id, status, payment_method, 1 AS orders, order_amount, total_amount
+        FROM changed WHERE present
+        UNION ALL
+        SELECT old_hour, old_restaurant_id, old_status, old_payment_method, -1, -old_order_amount, -old_total_amount
+        FROM changed WHERE counted
+    ),
+    hourly AS (
+        INSERT INTO order_rollups_hourly AS r
+            (hour, restaurant_id, status, payment_method, order_count, order_amount, total_amount)
+        SELECT hour, restaurant_id, status, payment_method, sum(orders), sum(order_amount), sum(total_amount)
+        FROM deltas
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (hour, restaurant_id, status, payment_method) DO UPDATE SET
+            order_count = r.order_count + EXCLUDED.order_count,
+            order_amount = r.order_amount + EXCLUDED.order_amount,
+            total_amount = r.total_amount + EXCLUDED.total_amount
+    ),
+    daily AS (
+        INSERT INTO order_rollups_daily AS r
+            (day, restaurant_id, status, payment_method, order_count, order_amount, total_amount)
+        SELECT (hour AT TIME ZONE 'UTC')::date, restaurant_id, status, payment_method,
+               sum(orders), sum(order_amount), sum(total_amount)
+        FROM deltas
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (day, restaurant_id, status, payment_method) DO UPDATE SET
+            order_count = r.order_count + EXCLUDED.order_count,
+            order_amount = r.order_amount + EXCLUDED.order_amount,
+            total_amount = r.total_amount + EXCLUDED.total_amount
+    ),
+    totals AS (
+        INSERT INTO order_rollup_totals AS r (status, payment_method, order_count, order_amount, total_amount)
+        SELECT status, payment_method, sum(orders), sum(order_amount), sum(total_amount)
+        FROM deltas
+        GROUP BY 1, 2
+        ON CONFLICT (status, payment_method) DO UPDATE SET
+            order_count = r.order_count + EXCLUDED.order_count,
+            order_amount = r.order_amount + EXCLUDED.order_amount,
+            total_amount = r.total_amount + EXCLUDED.total_amount
+    ),
+    stored AS (
+        INSERT INTO order_rollup_state AS s
+            (order_id, hour, restaurant_id, status, payment_method, order_amount, total_amount)
+        SELECT id, hour, restaurant_id, status, payment_method, order_amount, total_amount
+        FROM changed WHERE present
+        ON CONFLICT (order_id) DO UPDATE SET
+            hour = EXCLUDED.hour, restaurant_id = EXCLUDED.restaurant_id, status = EXCLUDED.status,
+            payment_method = EXCLUDED.payment_method, order_amount = EXCLUDED.order_amount,
+            total_amount = EXCLUDED.total_amount
+    ),
+    forgotten AS (
+        DELETE FROM order_rollup_state s USING changed c
+        WHERE s.order_id = c.id AND NOT c.present
+    )
+    SELECT count(*) INTO changed_count FROM changed;
+    RETURN changed_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Apply up to `max_orders` orders changed since the watermark, and up to as
+-- many deletions, in the caller's transaction; returns the orders read (both
+-- kinds). Call again until it returns 0 to catch up.
+--
+-- Orders are only read up to the start of the oldest other open transaction:
+-- updated_at is its writer's transaction start, so a transaction still in
+-- flight can commit rows behind rows already read. Stopping short of it means
+-- nothing is passed over; the rollups lag by that transaction's age.
+-- The role needs to see other sessions in pg_stat_activity (same role or
+-- pg_read_all_stats).
+CREATE OR REPLACE FUNCTION refresh_order_rollups(max_orders INT DEFAULT 10000)
+RETURNS INT AS $$
+DECLARE
+    mark order_rollup_watermark%ROWTYPE;
+    horizon TIMESTAMP WITH TIME ZONE;
+    ids UUID[];
+    last_updated_at TIMESTAMP WITH TIME ZONE;
+    last_id UUID;
+    deleted_ids UUID[];
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('order_rollups'));
+    SELECT * INTO mark FROM order_rollup_watermark;
+
+    SELECT COALESCE(min(xact_start), clock_timestamp()) INTO horizon
+    FROM pg_stat_activity
+    WHERE pid <> pg_backend_pid() AND backend_type = 'client backend' AND xact_start IS NOT NULL;
+
+    SELECT array_agg(id ORDER BY updated_at, id), max(updated_at) INTO ids, last_updated_at
+    FROM (
+        SELECT id, updated_at FROM orders
+        WHERE (updated_at, id) > (mark.updated_at, mark.order_id) AND updated_at < horizon
+        ORDER BY updated_at, id
+        LIMIT max_orders
+    ) batch;
+
+    IF ids IS NOT NULL THEN
+        last_id := ids[array_length(ids, 1)];
+        PERFORM apply_order_rollup_changes(ids);
+        UPDATE order_rollup_watermark SET updated_at = last_updated_at, order_id = last_id;
+    END IF;
+
+    WITH gone AS (
+        DELETE FROM order_rollup_deletes
+        WHERE ctid = ANY(ARRAY(SELECT ctid FROM order_rollup_deletes LIMIT max_orders))
+        RETURNING order_id
+    )
+    SELECT array_agg(order_id) INTO deleted_ids FROM gone;
+    PERFORM apply_order_rollup_changes(deleted_ids);
+
+    UPDATE order_rollup_watermark SET refreshed_at = NOW();
+    RETURN COALESCE(array_length(ids, 1), 0) + COALESCE(array_length(deleted_ids, 1), 0);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Empty the rollups and rewind the watermark, so refresh_order_rollups()
+-- rebuilds them from every order (see order_rollups.py backfill).
+CREATE OR REPLACE FUNCTION reset_order_rollups()
+RETURNS VOID AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('order_rollups'));
+    TRUNCATE order_rollups_hourly, order_rollups_daily, order_rollup_totals, order_rollup_state,
+             order_rollup_deletes;
+    UPDATE order_rollup_watermark
+    SET updated_at = '-infinity', order_id = '00000000-0000-0000-0000-000000000000', refreshed_at = NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- 3 & 4. Orders and Sales by Type, same return type as before: orders per
+-- status, and sales (total_amount of orders not cancelled or rejected) per
+-- payment method
+CREATE OR REPLACE FUNCTION get_dashboard_orders_by_type()
+RETURNS SETOF chart_data_point_table AS $$
+    SELECT SUM(order_count)::FLOAT, status
+    FROM order_rollup_totals
+    GROUP BY status
+    HAVING SUM(order_count) > 0
+    ORDER BY status;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION get_dashboard_sales_by_type()
+RETURNS SETOF chart_data_point_table AS $$
+    SELECT SUM(total_amount)::FLOAT, COALESCE(payment_method, 'UNKNOWN')
+    FROM order_rollup_totals
+    WHERE status NOT IN ('CANCELLED', 'REJECTED')
+    GROUP BY 2
+    HAVING SUM(order_count) > 0
+    ORDER BY 2;
+$$ LANGUAGE sql STABLE;
@@ -23,9 +23,12 @@ DECLARE
     item_record JSONB;
     addon_record JSONB;
     new_order_item_id UUID;
+    seq_value BIGINT;
 BEGIN
     -- Generate human readable ID: ORD-YYYYMMDD-XXXX
-    human_order_id := 'ORD-' || to_char(NOW(), 'YYYYMMDD') || '-' || LPAD(nextval('order_id_seq')::text, 4, '0');
+    -- (LPAD alone would cut sequence values past 9999 down to 4 digits and repeat ids)
+    seq_value := nextval('order_id_seq');
+    human_order_id := 'ORD-' || to_char(NOW(), 'YYYYMMDD') || '-' || LPAD(seq_value::text, GREATEST(length(seq_value::text), 4), '0');
 
     -- Insert into orders
     INSERT INTO orders (
@@ -0,0 +1,14 @@
+-- ============================================
+-- KEYSET PAGINATION FOR restaurantsPaginated
+-- ============================================
+
+-- Cursor pagination seeks on (created_at, id), so created_at must never be NULL
+UPDATE restaurants SET created_at = COALESCE(updated_at, NOW()) WHERE created_at IS NULL;
+ALTER TABLE restaurants ALTER COLUMN created_at SET DEFAULT NOW();
+ALTER TABLE restaurants ALTER COLUMN created_at SET NOT NULL;
+
+-- Serves ORDER BY created_at DESC, id DESC and the (created_at, id) < (...) seek
+CREATE INDEX IF NOT EXISTS idx_restaurants_created_at_id ON restaurants (created_at DESC, id DESC);
+
+-- Keep planner statistics fresh for countMode = 'estimated'
+ANALYZE restaurants;
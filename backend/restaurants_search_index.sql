@@ -0,0 +1,12 @@
+-- ============================================
+-- TRIGRAM SEARCH FOR restaurantsPaginated
+-- ============================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- GIN trigram indexes serve both the ILIKE '%q%' substring search
+-- and the fuzzy (<% word similarity) search on name and address
+CREATE INDEX IF NOT EXISTS idx_restaurants_name_trgm ON restaurants USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_restaurants_address_trgm ON restaurants USING GIN (address gin_trgm_ops);
+
+ANALYZE restaurants;